@@ -0,0 +1,318 @@
+import json
+import random
+import threading
+import time
+from pymilvus import Collection, DataType
+from ingestMetrics import METRICS, RateLimitedSummary
+from logIds import SnowflakeIdAllocator
+from milvusClient import get_pool
+from logTemplater import extract_template
+from vectorCodec import encode_vectors, truncate_utf8, vector_type_of
+
+# Column order of the log collections created by streamerToMilvus.create_collection
+LOG_FIELDS = ["log_id", "timestamp", "service", "log_level", "host", "namespace", "pod_name", "trace_id", "raw_log", "template", "params", "count", "first_seen", "last_seen", "embedding"]
+
+# How each collection field is read from a log entry
+FIELD_GETTERS = {
+    "log_id": lambda log_entry: log_entry["log_id"],
+    "timestamp": lambda log_entry: log_entry["timestamp"],
+    "service": lambda log_entry: log_entry["application"],
+    "log_family": lambda log_entry: log_entry.get("log_family", ""),
+    "log_level": lambda log_entry: log_entry["level"],
+    "host": lambda log_entry: log_entry.get("host", "default_host"),
+    "namespace": lambda log_entry: log_entry.get("namespace", "default_namespace"),
+    "pod_name": lambda log_entry: log_entry.get("pod_name", "default_pod"),
+    "trace_id": lambda log_entry: log_entry.get("trace_id", str(random.randint(1, 1000000))),
+    "raw_log": lambda log_entry: log_entry["message"],
+    "template": lambda log_entry: log_entry["template"],
+    "params": lambda log_entry: log_entry["params"] if isinstance(log_entry["params"], str) else json.dumps(log_entry["params"]),
+    "count": lambda log_entry: log_entry.get("count", 1),  # Set by burstAggregator.BurstAggregator
+    "first_seen": lambda log_entry: log_entry.get("first_seen", log_entry["timestamp"]),
+    "last_seen": lambda log_entry: log_entry.get("last_seen", log_entry["timestamp"]),
+    "embedding": lambda log_entry: log_entry["embedding"],
+}
+
+# Rough per-row size used for the byte threshold (384 float32 values plus scalar fields)
+EMBEDDING_BYTES = 384 * 4
+ROW_OVERHEAD_BYTES = 256
+
+
+def build_columns(log_entries, fields=LOG_FIELDS):
+    """Turn embedded log entries into column-oriented insert data for the given fields."""
+    return [[FIELD_GETTERS[field](log_entry) for log_entry in log_entries] for field in fields]
+
+
+def fit_columns(columns, fields, max_lengths: dict, vector_type: str = "float32"):
+    """Truncate VARCHAR values to their field's max_length and encode embeddings for the vector field type."""
+    fitted = []
+    for field, column in zip(fields, columns):
+        if field == "embedding":
+            column = encode_vectors(column, vector_type)
+        elif field in max_lengths:
+            column = [truncate_utf8(value, max_lengths[field]) for value in column]
+        fitted.append(column)
+    return fitted
+
+
+class BatchingLogWriter:
+    """Buffer log entries per collection and insert them into Milvus in large batches.
+
+    A collection's buffer is flushed when it reaches ``max_rows`` entries, when its
+    estimated size reaches ``max_bytes``, or when its oldest entry has waited
+    ``max_latency`` seconds. Messages are reduced to their templates and the
+    embeddings are computed once per flush by calling ``embed_batch`` with the
+    list of buffered templates. Entries that already carry an ``embedding`` are
+    inserted as they are, so ``embed_batch`` may be None when an upstream stage
+    does the embedding.
+
+    When ``router`` is given it is called as ``router(collection_name, log_entry)``
+    and returns the partition the entry belongs in (or None for the default
+    partition); each partition is buffered and inserted separately.
+
+    Entries without a ``log_id`` get one from ``id_allocator`` when they are
+    added. A failed insert is retried up to ``retries`` times as an upsert,
+    so rows that reached Milvus before the failure are not duplicated; with
+    ``upsert=True`` every batch is written as an upsert. A batch that still
+    fails is put back into its buffer and written by a later flush. A failure
+    while flushing from add() or the latency timer is raised from the next
+    add() or close(); an entry add() raises for was not buffered.
+
+    Inserts go through the shared milvusClient pool to the write endpoint;
+    flushing several buffers embeds them in one call and inserts them
+    concurrently over the pool's connections.
+
+    Flush, embed and insert timings go to ingestMetrics.METRICS; progress is
+    printed as one summary line per ``report_interval`` seconds.
+    """
+
+    def __init__(self, embed_batch=None, max_rows: int = 5000, max_bytes: int = 16 * 1024 * 1024, max_latency: float = 1.0,
+                 router=None, id_allocator=None, upsert: bool = False, retries: int = 3, retry_backoff: float = 0.5,
+                 report_interval: float = 10.0):
+        self.embed_batch = embed_batch
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_latency = max_latency
+        self.router = router
+        self.id_allocator = id_allocator or SnowflakeIdAllocator()
+        self.upsert = upsert
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self._summary = RateLimitedSummary("writer", report_interval)
+
+        self._buffers = {}      # (collection name, partition name) -> buffered log entries
+        self._buffer_bytes = {}  # (collection name, partition name) -> estimated buffered size
+        self._oldest = {}       # (collection name, partition name) -> time the oldest buffered entry arrived
+        self._collections = {}  # collection name -> cached (Collection handle, insert field names, VARCHAR max lengths, vector type)
+        self._partitions = set()  # (collection name, partition name) pairs known to exist
+        self._lock = threading.Lock()
+        self._error = None
+
+        self.rows_written = 0
+        self.retry_count = 0
+        self.flush_count = 0
+        self.flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self._started = time.time()
+
+        # Background thread that enforces max_latency when no new entries arrive
+        self._closed = threading.Event()
+        self._timer = threading.Thread(target=self._flush_stale, daemon=True)
+        self._timer.start()
+
+    def add(self, collection_name: str, log_entry: dict):
+        """Buffer a log entry, flushing its buffer if a threshold is reached."""
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+        if self._closed.is_set():
+            raise RuntimeError("BatchingLogWriter is closed")
+
+        if "log_id" not in log_entry:
+            log_entry["log_id"] = self.id_allocator.allocate(log_entry)
+        key = (collection_name, self.router(collection_name, log_entry) if self.router else None)
+        batch = None
+        with self._lock:
+            buffer = self._buffers.setdefault(key, [])
+            if not buffer:
+                self._oldest[key] = time.monotonic()
+                self._buffer_bytes[key] = 0
+            buffer.append(log_entry)
+            self._buffer_bytes[key] += len(log_entry["message"]) + EMBEDDING_BYTES + ROW_OVERHEAD_BYTES
+            if len(buffer) >= self.max_rows or self._buffer_bytes[key] >= self.max_bytes:
+                batch = self._take(key)
+        if batch:
+            try:
+                self._write(key, batch)
+            except Exception as error:  # The entry is buffered again; surface on the next add()/close()
+                METRICS.inc("errors_total", stage="flush")
+                self._restore(key, batch)
+                self._error = error
+
+    def flush(self, collection_name: str = None):
+        """Insert everything buffered for one collection, or for all collections.
+
+        Batches that cannot be written are put back into their buffers before the error is raised.
+        """
+        keys = [key for key in list(self._buffers) if collection_name is None or key[0] == collection_name]
+        with self._lock:
+            batches = [(key, batch) for key, batch in ((key, self._take(key)) for key in keys) if batch]
+        if len(batches) == 1:
+            try:
+                self._write(*batches[0])
+            except Exception:
+                self._restore(*batches[0])
+                raise
+        elif batches:
+            try:
+                self._embed([log_entry for _, batch in batches for log_entry in batch])
+            except Exception:
+                for key, batch in batches:
+                    self._restore(key, batch)
+                raise
+            futures = [get_pool().executor.submit(self._write, key, batch) for key, batch in batches]
+            errors = [future.exception() for future in futures]
+            for (key, batch), error in zip(batches, errors):
+                if error is not None:
+                    self._restore(key, batch)
+            if any(errors):
+                raise next(error for error in errors if error)
+
+    def discard(self):
+        """Drop every buffered entry without writing it (the caller will replay them)."""
+        with self._lock:
+            for key in list(self._buffers):
+                self._take(key)
+            self._error = None
+
+    def close(self):
+        """Stop the latency timer and flush all remaining entries."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._timer.join()
+        self.flush()
+        self._summary.flush()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def stats(self) -> dict:
+        """Return throughput and flush latency counters."""
+        elapsed = max(time.time() - self._started, 1e-9)
+        return {
+            "rows_written": self.rows_written,
+            "rows_per_sec": self.rows_written / elapsed,
+            "retries": self.retry_count,
+            "flushes": self.flush_count,
+            "avg_flush_ms": 1000 * self.flush_seconds / self.flush_count if self.flush_count else 0.0,
+            "max_flush_ms": 1000 * self.max_flush_seconds,
+        }
+
+    def _collection(self, collection_name: str):
+        """Return a cached Collection handle, the fields an insert must supply in schema order,
+        the max_length of its VARCHAR fields and the storage type of its embedding field."""
+        cached = self._collections.get(collection_name)
+        if cached is None:
+            collection = get_pool().collection(collection_name, "write")
+            schema_fields = collection.schema.fields
+            fields = [field.name for field in schema_fields if not field.auto_id]
+            max_lengths = {field.name: field.params["max_length"] for field in schema_fields if field.dtype == DataType.VARCHAR}
+            vector_type = next(vector_type_of(field.dtype) for field in schema_fields if field.name == "embedding")
+            cached = self._collections[collection_name] = (collection, fields, max_lengths, vector_type)
+        return cached
+
+    def _ensure_partition(self, collection: Collection, collection_name: str, partition_name: str):
+        """Create a partition the first time it is written to."""
+        if (collection_name, partition_name) in self._partitions:
+            return
+        if not collection.has_partition(partition_name):
+            try:
+                collection.create_partition(partition_name)
+            except Exception:
+                if not collection.has_partition(partition_name):  # Lost a race with another writer otherwise
+                    raise
+        self._partitions.add((collection_name, partition_name))
+
+    def _take(self, key):
+        """Detach and return a buffer. Caller must hold the lock."""
+        batch = self._buffers.get(key)
+        if batch:
+            self._buffers[key] = []
+            self._buffer_bytes[key] = 0
+        return batch
+
+    def _restore(self, key, batch):
+        """Put a batch that could not be written back in front of its buffer."""
+        with self._lock:
+            buffer = self._buffers.setdefault(key, [])
+            if not buffer:
+                self._buffer_bytes[key] = 0
+            self._oldest[key] = time.monotonic()  # The latency timer retries it after another max_latency
+            buffer[:0] = batch
+            self._buffer_bytes[key] += sum(len(log_entry["message"]) + EMBEDDING_BYTES + ROW_OVERHEAD_BYTES for log_entry in batch)
+
+    def _embed(self, log_entries):
+        """Template and embed the entries that do not carry an embedding yet."""
+        pending = [log_entry for log_entry in log_entries if "embedding" not in log_entry]
+        if pending:
+            for log_entry in pending:
+                if "template" not in log_entry:
+                    log_entry["template"], log_entry["params"] = extract_template(log_entry["message"])
+            with METRICS.timer("embed", len(pending)):
+                embeddings = self.embed_batch([log_entry["template"] for log_entry in pending])
+            for log_entry, embedding in zip(pending, embeddings):
+                log_entry["embedding"] = embedding
+
+    def _write(self, key, batch):
+        """Template, embed and insert one batch of log entries."""
+        collection_name, partition_name = key
+        start = time.perf_counter()
+        self._embed(batch)
+        _, fields, max_lengths, vector_type = self._collection(collection_name)
+        columns = fit_columns(build_columns(batch, fields), fields, max_lengths, vector_type)
+        for attempt in range(self.retries + 1):
+            try:
+                collection = get_pool().collection(collection_name, "write")  # Another pooled connection on a retry
+                if partition_name:
+                    self._ensure_partition(collection, collection_name, partition_name)
+                with METRICS.timer("insert", len(batch)):
+                    if self.upsert or attempt:
+                        collection.upsert(columns, partition_name=partition_name)  # Idempotent on the log_id primary key
+                    else:
+                        collection.insert(columns, partition_name=partition_name)
+                break
+            except Exception as error:
+                if attempt == self.retries:
+                    raise
+                METRICS.inc("retries_total", stage="insert")
+                with self._lock:
+                    self.retry_count += 1
+                print(f"Write to '{collection_name}' failed ({error}); retrying in {self.retry_backoff * 2 ** attempt:.1f} s")
+                time.sleep(self.retry_backoff * 2 ** attempt)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.rows_written += len(batch)
+            self.flush_count += 1
+            self.flush_seconds += elapsed
+            self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        METRICS.observe("stage_seconds", elapsed, stage="flush")
+        METRICS.observe("batch_rows", len(batch), stage="flush")
+        METRICS.inc("rows_total", len(batch), stage="flush")
+        self._summary.record({f"{collection_name}/{partition_name}" if partition_name else collection_name: len(batch)}, elapsed)
+
+    def _flush_stale(self):
+        """Flush buffers whose oldest entry has exceeded max_latency."""
+        while not self._closed.wait(self.max_latency / 4):
+            now = time.monotonic()
+            for key in list(self._buffers):
+                with self._lock:
+                    stale = self._buffers.get(key) and now - self._oldest[key] >= self.max_latency
+                    batch = self._take(key) if stale else None
+                if batch:
+                    try:
+                        self._write(key, batch)
+                    except Exception as error:  # Buffered again; surface on the next add()/close()
+                        METRICS.inc("errors_total", stage="flush")
+                        self._restore(key, batch)
+                        self._error = error
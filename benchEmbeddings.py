@@ -0,0 +1,64 @@
+import argparse
+import sys
+import time
+import numpy as np
+from embeddingService import BACKENDS, MODEL_NAME, load_model
+import streamerToMilvus
+
+
+def sample_messages(count: int, seed: int = 0):
+    """Return generated log messages spread over every log family."""
+    streamerToMilvus.random.seed(seed)
+    families = list(streamerToMilvus.COLLECTIONS.values())
+    return [streamerToMilvus.generate_log(families[i % len(families)])["message"] for i in range(count)]
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Row-wise cosine similarity of two matrices."""
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return np.sum(a * b, axis=1)
+
+
+def throughput(model, messages, batch_size: int, rounds: int) -> float:
+    """Return sentences/sec of model.encode over the messages (best of several rounds)."""
+    model.encode(messages[:batch_size], batch_size=batch_size)  # Warm-up
+    best = 0.0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        model.encode(messages, batch_size=batch_size, convert_to_numpy=True)
+        best = max(best, len(messages) / (time.perf_counter() - start))
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check embedding backends against the fp32 torch model and compare their CPU throughput.")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS), help="Backends to evaluate")
+    parser.add_argument("--model", default=MODEL_NAME, help="SentenceTransformer model")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1], help="Thread counts to benchmark")
+    parser.add_argument("--batch-size", type=int, default=64, help="Sentences per model call")
+    parser.add_argument("--sentences", type=int, default=2000, help="Sentences embedded per throughput round")
+    parser.add_argument("--parity-sentences", type=int, default=500, help="Sentences compared with the reference model")
+    parser.add_argument("--rounds", type=int, default=3, help="Timed rounds per measurement (the best is reported)")
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="Fail when a backend's mean cosine to the reference is lower")
+    args = parser.parse_args()
+
+    messages = sample_messages(args.sentences)
+    parity_messages = messages[:args.parity_sentences]
+    reference = load_model(args.model, "torch").encode(parity_messages, batch_size=args.batch_size, convert_to_numpy=True)
+
+    failed = []
+    print(f"{'backend':<10} {'threads':>7} {'sent/sec':>10} {'per core':>10} {'mean cos':>9} {'min cos':>9}")
+    for backend in args.backends:
+        for threads in args.threads:
+            model = load_model(args.model, backend, threads)
+            similarity = cosine(model.encode(parity_messages, batch_size=args.batch_size, convert_to_numpy=True), reference)
+            rate = throughput(model, messages, args.batch_size, args.rounds)
+            print(f"{backend:<10} {threads:>7} {rate:>10.0f} {rate / threads:>10.0f} {similarity.mean():>9.4f} {similarity.min():>9.4f}")
+            if similarity.mean() < args.min_cosine:
+                failed.append(f"{backend}/{threads} threads")
+
+    if failed:
+        print(f"Parity check failed (mean cosine < {args.min_cosine}): {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Parity check passed: every backend has mean cosine >= {args.min_cosine} to the fp32 torch model.")
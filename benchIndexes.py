@@ -0,0 +1,207 @@
+import argparse
+import time
+import numpy as np
+from embeddingService import EmbeddingService
+import streamerToMilvus
+
+# Config keys that are search-time parameters rather than build parameters
+SEARCH_KEYS = {"nprobe", "ef", "search_list"}
+
+DEFAULT_CONFIGS = ["FLAT", "IVF_FLAT:nlist=128,nprobe=16", "IVF_SQ8:nlist=128,nprobe=16", "HNSW:M=16,efConstruction=200,ef=64"]
+
+def parse_config(text: str):
+    """Parse 'INDEX_TYPE:key=value,...' into (index type, build params, search params)."""
+    index_type, _, params = text.partition(":")
+    build, search = {}, {}
+    for item in filter(None, params.split(",")):
+        key, value = item.split("=")
+        (search if key in SEARCH_KEYS else build)[key] = int(value)
+    index_type = index_type.upper()
+    return index_type, {**streamerToMilvus.INDEX_BUILD_PARAMS.get(index_type, {}), **build}, search
+
+def load_dataset(num_logs: int, num_queries: int, metric: str, seed: int):
+    """Embed generated log lines into a data matrix and a held-out query matrix."""
+    import random
+    random.seed(seed)
+    families = list(streamerToMilvus.COLLECTIONS.values())
+    messages = [streamerToMilvus.generate_log(families[i % len(families)])["message"] for i in range(num_logs + num_queries)]
+    vectors = EmbeddingService(cache_size=0).embed_array(messages)
+    if metric == "COSINE":
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors[:num_logs], vectors[num_logs:]
+
+def scores(queries, vectors, metric: str, vector_norms=None):
+    """Similarity scores of each query against each vector; larger is closer."""
+    products = queries @ vectors.T
+    if metric == "L2":
+        norms = vector_norms if vector_norms is not None else np.einsum("ij,ij->i", vectors, vectors)
+        return 2 * products - norms  # -||q - x||^2 up to a per-query constant
+    return products
+
+def top_k(score_matrix, k: int):
+    """Indices of the k largest scores per row, best first."""
+    k = min(k, score_matrix.shape[1])
+    candidates = np.argpartition(-score_matrix, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(score_matrix, candidates, axis=1), axis=1)
+    return np.take_along_axis(candidates, order, axis=1)
+
+def ground_truth(data, queries, k: int, metric: str, block: int = 256):
+    """Exact top-k neighbours by brute force."""
+    norms = np.einsum("ij,ij->i", data, data)
+    return np.vstack([top_k(scores(queries[i:i + block], data, metric, norms), k) for i in range(0, len(queries), block)])
+
+def kmeans(data, clusters: int, iterations: int = 10, seed: int = 0):
+    """Plain Lloyd's k-means on a sample of the data, returning the centroids."""
+    rng = np.random.default_rng(seed)
+    sample = data[rng.choice(len(data), size=min(len(data), clusters * 40), replace=False)]
+    centroids = sample[rng.choice(len(sample), size=clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = top_k(scores(sample, centroids, "L2"), 1)[:, 0]
+        for cluster in range(clusters):
+            members = sample[assignment == cluster]
+            if len(members):
+                centroids[cluster] = members.mean(axis=0)
+    return centroids
+
+class NumpyIndex:
+    """In-process stand-in for FLAT, IVF_FLAT, IVF_SQ8 and (with hnswlib) HNSW indexes."""
+
+    def __init__(self, index_type: str, metric: str, build: dict):
+        if index_type not in ("FLAT", "IVF_FLAT", "IVF_SQ8", "HNSW"):
+            raise ValueError(f"The in-process stand-in does not implement {index_type}; use --uri to benchmark it on Milvus")
+        self.index_type, self.metric, self.params = index_type, metric, build
+
+    def build(self, data):
+        self.size = data.nbytes
+        if self.index_type == "FLAT":
+            self.data, self.norms = data, np.einsum("ij,ij->i", data, data)
+        elif self.index_type == "HNSW":
+            import hnswlib
+            space = {"L2": "l2", "IP": "ip", "COSINE": "cosine"}[self.metric]
+            self.hnsw = hnswlib.Index(space=space, dim=data.shape[1])
+            self.hnsw.init_index(max_elements=len(data), ef_construction=self.params["efConstruction"], M=self.params["M"])
+            self.hnsw.add_items(data, np.arange(len(data)))
+            self.size = data.nbytes + len(data) * self.params["M"] * 2 * 4  # Vectors plus level-0 links
+        else:
+            self.centroids = kmeans(data, self.params["nlist"])
+            assignment = top_k(scores(data, self.centroids, "L2"), 1)[:, 0]
+            self.lists = [np.flatnonzero(assignment == cluster) for cluster in range(len(self.centroids))]
+            if self.index_type == "IVF_SQ8":
+                self.low = data.min(axis=0)
+                self.scale = (data.max(axis=0) - self.low) / 255 + 1e-12
+                self.codes = np.round((data - self.low) / self.scale).astype(np.uint8)
+                self.size = self.codes.nbytes + self.centroids.nbytes + 2 * self.low.nbytes
+            else:
+                self.data = data
+                self.size = data.nbytes + self.centroids.nbytes
+            self.size += len(data) * 8  # Row ids
+
+    def search(self, query, k: int, search: dict):
+        query = query[None, :]
+        if self.index_type == "FLAT":
+            return top_k(scores(query, self.data, self.metric, self.norms), k)[0]
+        if self.index_type == "HNSW":
+            self.hnsw.set_ef(max(search.get("ef", 64), k))
+            return self.hnsw.knn_query(query, k=k)[0][0]
+        probes = top_k(scores(query, self.centroids, "L2"), search.get("nprobe", 16))[0]
+        candidates = np.concatenate([self.lists[probe] for probe in probes])
+        vectors = self.codes[candidates] * self.scale + self.low if self.index_type == "IVF_SQ8" else self.data[candidates]
+        return candidates[top_k(scores(query, vectors.astype(np.float32), self.metric), k)[0]]
+
+    def memory_bytes(self) -> int:
+        return self.size
+
+class MilvusIndex:
+    """Benchmark an index type on a Milvus server or a Milvus Lite database file."""
+
+    COLLECTION = "index_benchmark"
+
+    def __init__(self, index_type: str, metric: str, build: dict, uri: str):
+        from pymilvus import connections
+        connections.connect(alias="default", uri=uri)
+        self.index_params = {"index_type": index_type, "metric_type": metric, "params": build}
+
+    def build(self, data):
+        from pymilvus import Collection, CollectionSchema, DataType, FieldSchema, utility
+        if utility.has_collection(self.COLLECTION):
+            utility.drop_collection(self.COLLECTION)
+        schema = CollectionSchema([
+            FieldSchema(name="id", dtype=DataType.INT64, is_primary=True),
+            FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=data.shape[1]),
+        ])
+        self.collection = Collection(self.COLLECTION, schema=schema)
+        for start in range(0, len(data), 10000):
+            self.collection.insert([list(range(start, start + len(data[start:start + 10000]))), data[start:start + 10000].tolist()])
+        self.collection.flush()
+        self.collection.create_index(field_name="embedding", index_params=self.index_params)
+        utility.wait_for_index_building_complete(self.COLLECTION)
+        self.collection.load()
+        self.count, self.dim = data.shape
+
+    def search(self, query, k: int, search: dict):
+        results = self.collection.search(data=[query.tolist()], anns_field="embedding", limit=k,
+                                         param={"metric_type": self.index_params["metric_type"], "params": search})
+        return np.array([hit.id for hit in results[0]])
+
+    def memory_bytes(self) -> int:
+        """Estimated from the index layout; Milvus does not report per-index memory."""
+        params, n, d = self.index_params["params"], self.count, self.dim
+        index_type = self.index_params["index_type"]
+        if index_type == "IVF_SQ8":
+            return n * d + n * 8
+        if index_type == "IVF_PQ":
+            return n * params["m"] * params["nbits"] // 8 + n * 8
+        if index_type == "HNSW":
+            return n * d * 4 + n * params["M"] * 2 * 4
+        return n * d * 4 + n * 8
+
+def run_config(config: str, data, queries, truth, k: int, metric: str, uri: str = None) -> dict:
+    """Build one index configuration and measure recall, latency and memory."""
+    index_type, build, search = parse_config(config)
+    index = MilvusIndex(index_type, metric, build, uri) if uri else NumpyIndex(index_type, metric, build)
+
+    start = time.perf_counter()
+    index.build(data)
+    build_seconds = time.perf_counter() - start
+
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = index.search(query, k, search)
+        latencies.append(time.perf_counter() - start)
+        hits += len(np.intersect1d(found[:k], expected))
+    return {
+        "config": config,
+        "build_s": build_seconds,
+        "memory_mb": index.memory_bytes() / 2 ** 20,
+        "recall": hits / (k * len(queries)),
+        "p50_ms": 1000 * np.percentile(latencies, 50),
+        "p99_ms": 1000 * np.percentile(latencies, 99),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare vector index configurations on generated log embeddings.")
+    parser.add_argument("--logs", type=int, default=20000, help="Number of indexed log lines")
+    parser.add_argument("--queries", type=int, default=200, help="Number of held-out query lines")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query for recall@k")
+    parser.add_argument("--metric", type=str.upper, choices=["L2", "IP", "COSINE"], default="L2", help="Distance metric")
+    parser.add_argument("--config", action="append", help="INDEX_TYPE[:key=value,...] to benchmark (repeatable)")
+    parser.add_argument("--uri", help="Benchmark on Milvus (server URI or Milvus Lite file) instead of the in-process stand-in")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the generated logs")
+    args = parser.parse_args()
+
+    print(f"Embedding {args.logs} logs and {args.queries} queries...")
+    data, queries = load_dataset(args.logs, args.queries, args.metric, args.seed)
+    start = time.perf_counter()
+    truth = ground_truth(data, queries, args.k, args.metric)
+    print(f"Exact ground truth computed in {time.perf_counter() - start:.2f} s")
+
+    print(f"{'config':<40} {'build s':>8} {'mem MB':>8} {f'recall@{args.k}':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for config in args.config or DEFAULT_CONFIGS:
+        try:
+            result = run_config(config, data, queries, truth, args.k, args.metric, args.uri)
+        except (ImportError, ValueError) as error:
+            print(f"{config:<40} skipped: {error}")
+            continue
+        print(f"{result['config']:<40} {result['build_s']:>8.2f} {result['memory_mb']:>8.1f} {result['recall']:>10.3f} "
+              f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f}")
@@ -0,0 +1,54 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from embeddingService import SOCKET_ENV
+
+# Runs in a fresh interpreter so nothing is already imported or loaded
+PROBE = """
+import time
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+{embed}
+print(imported - start, time.perf_counter() - imported)
+"""
+
+EMBED = "from embeddingService import get_model; get_model().encode(['Disk usage above 90% on /var'])"
+
+
+def run_probe(module: str, embed: bool, env: dict) -> tuple:
+    """Return (process wall seconds, import seconds, first-embedding seconds) of one fresh interpreter."""
+    code = PROBE.format(module=module, embed=EMBED if embed else "")
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    wall = time.perf_counter() - start
+    imported, embedded = (float(value) for value in output.split()[-2:])
+    return wall, imported, embedded
+
+
+def measure(label: str, module: str, embed: bool, env: dict, runs: int):
+    samples = [run_probe(module, embed, env) for _ in range(runs)]
+    wall, imported, embedded = (statistics.median(column) for column in zip(*samples))
+    first = f"{1000 * embedded:9.0f}" if embed else f"{'-':>9}"
+    print(f"{label:<38} {1000 * imported:9.0f} {first} {1000 * wall:9.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure import time and first-embedding latency of the tools.")
+    parser.add_argument("--modules", nargs="+", default=["streamerToMilvus", "checkLogs", "searchLogs", "embeddingService"],
+                        help="Modules whose import time is measured")
+    parser.add_argument("--socket", help="Also measure first-embedding latency through the embedding daemon on this socket")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per measurement (the median is reported)")
+    args = parser.parse_args()
+
+    local_env = {key: value for key, value in os.environ.items() if key != SOCKET_ENV}
+    print(f"{'measurement (median ms)':<38} {'import':>9} {'1st embed':>9} {'process':>9}")
+    for module in args.modules:
+        measure(f"import {module}", module, False, local_env, args.runs)
+    measure("first embedding, local model", "embeddingService", True, local_env, args.runs)
+    if args.socket:
+        measure("first embedding, daemon", "embeddingService", True, {**local_env, SOCKET_ENV: args.socket}, args.runs)
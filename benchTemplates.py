@@ -0,0 +1,30 @@
+import argparse
+import time
+from logTemplater import extract_template
+from streamerToMilvus import ERRORS, generate_log
+
+def run_benchmark(num_lines: int):
+    """Template a generated log stream and report how many embedding calls it saves."""
+    collection_types = list(ERRORS.keys())
+    messages = [generate_log(collection_types[i % len(collection_types)])["message"] for i in range(num_lines)]
+
+    start = time.perf_counter()
+    templates = [extract_template(message)[0] for message in messages]
+    elapsed = time.perf_counter() - start
+
+    unique_lines = len(set(messages))
+    unique_templates = len(set(templates))
+    print(f"Lines:                 {num_lines}")
+    print(f"Unique raw lines:      {unique_lines}")
+    print(f"Unique templates:      {unique_templates}")
+    print(f"Embedding calls (exact-string cache): {unique_lines}")
+    print(f"Embedding calls (template cache):     {unique_templates}")
+    print(f"Embedding calls saved: {unique_lines - unique_templates} ({1 - unique_templates / unique_lines:.2%})")
+    print(f"Templating throughput: {num_lines / elapsed:.0f} lines/sec")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark log templating against exact-string embedding reuse.")
+    parser.add_argument("--lines", type=int, default=100000, help="Number of generated log lines")
+    args = parser.parse_args()
+
+    run_benchmark(args.lines)
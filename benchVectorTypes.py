@@ -0,0 +1,55 @@
+import argparse
+import numpy as np
+from benchIndexes import ground_truth, load_dataset, top_k
+from vectorCodec import VECTOR_TYPES, vector_bytes
+
+DIM = 384
+
+
+def stored(vectors, vector_type: str):
+    """Return the vectors as a collection of the given type would compare them."""
+    if vector_type == "float16":
+        return vectors.astype(np.float16).astype(np.float32)
+    if vector_type == "binary":
+        return np.where(vectors > 0, 1.0, -1.0).astype(np.float32)  # Dot products rank exactly like Hamming distance
+    return vectors
+
+
+def search(data, queries, full_data, k: int, rerank: int, block: int = 256):
+    """Top-k by the stored vectors, optionally re-ranking k * rerank candidates against full precision."""
+    results = []
+    for start in range(0, len(queries), block):
+        query_block = queries[start:start + block]
+        candidates = top_k(query_block @ data.T, k * max(rerank, 1))
+        if rerank:
+            exact = np.einsum("qd,qcd->qc", query_block, full_data[candidates])
+            candidates = np.take_along_axis(candidates, top_k(exact, k), axis=1)
+        results.append(candidates[:, :k])
+    return np.vstack(results)
+
+
+def recall(found, truth) -> float:
+    return sum(len(set(row) & set(expected)) for row, expected in zip(found.tolist(), truth.tolist())) / truth.size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report embedding memory saved against recall lost for each vector storage type.")
+    parser.add_argument("--logs", type=int, default=20000, help="Number of indexed log lines")
+    parser.add_argument("--queries", type=int, default=200, help="Number of held-out query lines")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query for recall@k")
+    parser.add_argument("--rerank", type=int, default=4, help="Candidates per result re-ranked at full precision")
+    parser.add_argument("--rows", type=float, default=100e6, help="Retained rows to project memory for")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the generated logs")
+    args = parser.parse_args()
+
+    data, queries = load_dataset(args.logs, args.queries, "COSINE", args.seed)
+    truth = ground_truth(data, queries, args.k, "COSINE")
+    baseline = vector_bytes(DIM, "float32")
+
+    print(f"{'vector type':<12} {'bytes/row':>9} {'GB @ rows':>10} {'saved':>7} {f'recall@{args.k}':>10} {f'+rerank x{args.rerank}':>12}")
+    for vector_type in VECTOR_TYPES:
+        size = vector_bytes(DIM, vector_type)
+        data_stored, queries_stored = stored(data, vector_type), stored(queries, vector_type)
+        plain = recall(search(data_stored, queries_stored, data, args.k, 0), truth)
+        reranked = recall(search(data_stored, queries_stored, data, args.k, args.rerank), truth)
+        print(f"{vector_type:<12} {size:>9} {size * args.rows / 2 ** 30:>10.1f} {1 - size / baseline:>7.1%} {plain:>10.3f} {reranked:>12.3f}")
@@ -0,0 +1,248 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from ingestMetrics import METRICS
+from logTemplater import extract_template
+
+
+class BurstAggregator:
+    """Collapse repeated log lines into one representative row before they reach a BatchingLogWriter.
+
+    Entries of the same collection, service and level are grouped while they
+    fall within ``window_ms`` of the group's first entry, either because their
+    templates are identical or, when ``similarity`` and ``embed`` are given,
+    because the cosine similarity of their template embeddings reaches
+    ``similarity``. The candidate groups are searched with an in-memory
+    brute-force index over the open groups' vectors. A group is written as its
+    first entry plus ``count``, ``first_seen`` and ``last_seen``.
+
+    Template vectors are kept in an LRU of ``cache_size`` templates, so
+    reopened groups and repeats never call ``embed``. Entries whose template
+    has no vector yet wait until ``batch_size`` of them have arrived (or the
+    next sweep or flush) and their templates are embedded in one call.
+
+    Groups are emitted when a later entry falls outside their window, after
+    ``window_ms`` of wall-clock time, or on flush(). It has the writer's
+    add/flush/discard/close interface and can wrap the drainer's writer.
+
+    Groups the writer does not accept are kept and handed to it again on the
+    next sweep, flush() or close(); the failure is raised from the next add(),
+    flush() or close(), as BatchingLogWriter does with its background flushes.
+    """
+
+    def __init__(self, writer, window_ms: int = 10000, similarity: float = None, embed=None,
+                 batch_size: int = 256, cache_size: int = 10000):
+        self.writer = writer
+        self.window_ms = window_ms
+        self.similarity = similarity
+        self.embed = embed if similarity is not None else None
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+
+        self._groups = {}   # (collection, service, level, template) -> open group
+        self._vectors = {}  # (collection, service, level) -> {template: unit vector} of open groups
+        self._template_vectors = OrderedDict()  # template -> (embedding, unit vector), least recently used first
+        self._pending = []  # (collection, entry) waiting for their template to be embedded
+        self._failed = []   # Closed groups the writer has not accepted yet
+        self._lock = threading.Lock()
+        self._error = None
+        self.received = 0
+        self.emitted = 0
+        self.suppressed = 0
+
+        self._closed = threading.Event()
+        self._sweeper = threading.Thread(target=self._sweep, daemon=True)
+        self._sweeper.start()
+
+    def add(self, collection_name: str, log_entry: dict):
+        """Fold a log entry into its group, emitting groups whose window has closed."""
+        self._raise_error()
+        if self._closed.is_set():
+            raise RuntimeError("BurstAggregator is closed")
+        if "template" not in log_entry:
+            log_entry["template"], log_entry["params"] = extract_template(log_entry["message"])
+        with self._lock:
+            self.received += 1
+            cached = self._template_vector(log_entry["template"]) if self.embed is not None else None
+            if self.embed is not None and cached is None:
+                self._pending.append((collection_name, log_entry))
+                full = len(self._pending) >= self.batch_size
+                log_entry = None
+        if log_entry is not None:
+            self._emit(self._fold(collection_name, log_entry, cached))
+        elif full:
+            self._embed_pending()
+
+    def _template_vector(self, template: str):
+        """Return the cached (embedding, unit vector) of a template, or None. Caller must hold the lock."""
+        cached = self._template_vectors.get(template)
+        if cached is not None:
+            self._template_vectors.move_to_end(template)
+        return cached
+
+    def _embed_pending(self):
+        """Embed the templates of the waiting entries in one call and fold the entries in."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        templates = list(dict.fromkeys(log_entry["template"] for _, log_entry in pending))
+        try:
+            embeddings = self.embed(templates)
+        except Exception as error:  # Kept for the next sweep or flush; surface on the next add()/flush()/close()
+            METRICS.inc("errors_total", stage="aggregate")
+            with self._lock:
+                self._pending = pending + self._pending
+                self._error = error
+            return
+        vectors = {}
+        for template, embedding in zip(templates, embeddings):
+            vector = np.asarray(embedding, dtype=np.float32)
+            vectors[template] = (embedding, vector / (np.linalg.norm(vector) or 1.0))
+        with self._lock:
+            self._template_vectors.update(vectors)
+            while len(self._template_vectors) > self.cache_size:
+                self._template_vectors.popitem(last=False)
+        emit = []
+        for collection_name, log_entry in pending:
+            emit.extend(self._fold(collection_name, log_entry, vectors[log_entry["template"]]))
+        self._emit(emit)
+
+    def _fold(self, collection_name: str, log_entry: dict, cached=None):
+        """Add an entry to its group, opening one if needed; returns the groups it closed.
+
+        ``cached`` is the (embedding, unit vector) of the entry's template when similarity merging is on.
+        """
+        scope = (collection_name, log_entry["application"], log_entry["level"])
+        template = log_entry["template"]
+        emit = []
+        with self._lock:
+            if cached is not None and (*scope, template) not in self._groups:
+                similar = self._nearest(scope, cached[1])
+                if similar is not None:
+                    template = similar
+            key = (*scope, template)
+            group = self._groups.get(key)
+            timestamp = log_entry["timestamp"]
+            if group is not None and timestamp - group["entry"]["first_seen"] > self.window_ms:
+                emit.append(self._close_group(key))
+                group = None
+                template = log_entry["template"]  # Not a similar group's: the entry opens its own
+                key = (*scope, template)
+            if group is None:
+                log_entry.update(count=1, first_seen=timestamp, last_seen=timestamp)
+                self._groups[key] = {"collection": collection_name, "entry": log_entry, "opened": time.monotonic()}
+                if cached is not None:  # Every opened group, reopened ones included, is a merge candidate
+                    self._vectors.setdefault(scope, {})[template] = cached[1]
+                    log_entry["embedding"] = cached[0]  # Embedded once here; the writer reuses it
+            else:
+                entry = group["entry"]
+                entry["count"] += 1
+                entry["first_seen"] = min(entry["first_seen"], timestamp)
+                entry["last_seen"] = max(entry["last_seen"], timestamp)
+        return emit
+
+    def _nearest(self, scope, vector):
+        """Return the template of the open group in ``scope`` within the similarity threshold of
+        a unit vector, or None. Caller must hold the lock."""
+        candidates = self._vectors.get(scope)
+        if not candidates:
+            return None
+        templates = list(candidates)
+        scores = np.stack([candidates[template] for template in templates]) @ vector
+        best = int(np.argmax(scores))
+        return templates[best] if scores[best] >= self.similarity else None
+
+    def _close_group(self, key):
+        """Detach an open group. Caller must hold the lock."""
+        group = self._groups.pop(key)
+        vectors = self._vectors.get(key[:3])
+        if vectors is not None:
+            vectors.pop(key[3], None)
+        return group
+
+    def _emit(self, groups):
+        """Hand closed groups (after earlier failed ones) to the writer, keeping those it does not accept."""
+        with self._lock:
+            groups, self._failed = self._failed + groups, []
+        for index, group in enumerate(groups):
+            try:
+                self.writer.add(group["collection"], group["entry"])
+            except Exception as error:
+                METRICS.inc("errors_total", stage="aggregate")
+                with self._lock:
+                    self._failed = groups[index:] + self._failed
+                    self._error = error
+                return
+            count = group["entry"]["count"]
+            METRICS.inc("rows_total", stage="aggregate")
+            if count > 1:
+                METRICS.inc("rows_total", count - 1, stage="suppressed")
+            with self._lock:
+                self.emitted += 1
+                self.suppressed += count - 1
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _sweep(self):
+        """Emit groups that have been open for a full window of wall-clock time, and retry failed ones."""
+        interval = self.window_ms / 1000
+        while not self._closed.wait(min(interval / 4, 1.0)):
+            self._embed_pending()
+            now = time.monotonic()
+            with self._lock:
+                emit = [self._close_group(key) for key, group in list(self._groups.items()) if now - group["opened"] >= interval]
+            self._emit(emit)
+
+    def flush(self, collection_name: str = None):
+        """Emit every open group (of one collection, or all) and flush the writer."""
+        if self.embed is not None:
+            self._embed_pending()
+        with self._lock:
+            emit = [self._close_group(key) for key in list(self._groups) if collection_name is None or key[0] == collection_name]
+        self._emit(emit)
+        self._raise_error()
+        self.writer.flush(collection_name)
+
+    def discard(self):
+        """Drop open and failed groups and the writer's buffers (the caller will replay them)."""
+        with self._lock:
+            self._groups.clear()
+            self._vectors.clear()
+            self._pending = []
+            self._failed = []
+            self._error = None
+        self.writer.discard()
+
+    def close(self):
+        """Emit everything and close the writer."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._sweeper.join()
+        try:
+            self.flush()
+        finally:
+            self.writer.close()
+
+    def stats(self) -> dict:
+        """Return how many entries came in, how many rows went out and the reduction ratio."""
+        with self._lock:
+            return {
+                "received": self.received,
+                "emitted": self.emitted,
+                "suppressed": self.suppressed,
+                "pending": sum(group["entry"]["count"] for group in list(self._groups.values()) + self._failed) + len(self._pending),
+                "reduction": 1 - self.emitted / self.received if self.received else 0.0,
+            }
+
+
+def add_aggregation_arguments(parser):
+    """Add the burst aggregation options to a CLI."""
+    parser.add_argument("--aggregate-window", type=float, help="Collapse repeats of a template within this many seconds into one row")
+    parser.add_argument("--aggregate-similarity", type=float,
+                        help="Also merge different templates whose embeddings reach this cosine similarity (e.g. 0.97)")
@@ -1,20 +1,17 @@
-from pymilvus import connections, Collection, utility
+from pymilvus import Collection, utility
+from milvusClient import connect_to_milvus
 
-def connect_to_milvus(host: str, port: str):
-    """Connect to Milvus."""
-    connections.connect(alias="default", host=host, port=port)
-    print(f"Connected to Milvus at {host}:{port}")
-
-def print_collection_data(collection_name: str, limit: int = 10):
+def print_collection_data(collection_name: str, limit: int = 10, show_embedding: bool = False):
     """Print data from a Milvus collection."""
     # Load the collection
     collection = Collection(name=collection_name)
     collection.load()
 
-    # Query the collection to retrieve data
+    # Query the collection to retrieve data; embeddings are only fetched when they will be printed
+    output_fields = ["log_id", "timestamp", "service", "log_level", "raw_log"] + (["embedding"] if show_embedding else [])
     query_results = collection.query(
         expr="",  # Empty expression to retrieve all data
-        output_fields=["log_id", "timestamp", "service", "log_level", "raw_log", "embedding"],  # Fields to retrieve
+        output_fields=output_fields,  # Fields to retrieve
         limit=limit  # Limit the number of records returned
     )
 
@@ -26,16 +23,15 @@ def print_collection_data(collection_name: str, limit: int = 10):
         print(f"Service: {result['service']}")
         print(f"Log Level: {result['log_level']}")
         print(f"Raw Log: {result['raw_log']}")
-        print(f"Embedding: {result['embedding'][:5]}...")  # Print first 5 elements of the embedding vector
+        if show_embedding:
+            print(f"Embedding: {result['embedding'][:5]}...")  # Print first 5 elements of the embedding vector
         print("-" * 50)
 
 if __name__ == "__main__":
-    MILVUS_HOST = "192.168.2.220"
-    MILVUS_PORT = "19530"
     COLLECTION_NAME = "httpd_logs"
 
-    # Connect to Milvus
-    connect_to_milvus(MILVUS_HOST, MILVUS_PORT)
+    # Connect to Milvus ($MILVUS_HOST/$MILVUS_PORT, $MILVUS_ENDPOINTS or $MILVUS_CONFIG)
+    connect_to_milvus()
 
     # Check if the collection exists
     if COLLECTION_NAME in utility.list_collections():
@@ -0,0 +1,133 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import threading
+import numpy as np
+from embeddingService import BACKENDS, MODEL_NAME, SOCKET_ENV, EmbeddingService, load_model
+
+# Protocol: the client sends one JSON line {"messages": [...]}; the daemon answers
+# with a JSON line {"rows": n, "dim": d} followed by n * d little-endian float32
+# values, or with {"error": "..."} alone.
+
+
+class EmbeddingClient:
+    """Client of a running embedding daemon, usable wherever a SentenceTransformer is."""
+
+    def __init__(self, path: str, timeout: float = 60.0):
+        self.path = path
+        self.timeout = timeout
+        self.dim = None
+        self._sock = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.path)
+        self._sock, self._reader = sock, sock.makefile("rb")
+
+    def _request(self, messages):
+        if self._sock is None:
+            self._connect()
+        self._sock.sendall(json.dumps({"messages": messages}).encode("utf-8") + b"\n")
+        header = json.loads(self._reader.readline() or b'{"error": "connection closed by the daemon"}')
+        if "error" in header:
+            raise RuntimeError(f"Embedding daemon error: {header['error']}")
+        payload = self._reader.read(header["rows"] * header["dim"] * 4)
+        self.dim = header["dim"]
+        return np.frombuffer(payload, dtype="<f4").reshape(header["rows"], header["dim"])
+
+    def encode(self, sentences, batch_size: int = None, convert_to_numpy: bool = True, **kwargs):
+        """Embed one sentence or a list of sentences through the daemon."""
+        single = isinstance(sentences, str)
+        messages = [sentences] if single else list(sentences)
+        with self._lock:
+            try:
+                vectors = self._request(messages)
+            except (OSError, ValueError):  # Stale connection, e.g. after a daemon restart: retry once
+                self.close()
+                vectors = self._request(messages)
+        return vectors[0] if single else vectors
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self.dim is None:
+            self.encode([""])
+        return self.dim
+
+    def close(self):
+        if self._sock is not None:
+            self._reader.close()
+            self._sock.close()
+            self._sock = None
+
+
+class EmbeddingDaemon:
+    """Serve embeddings from one loaded model over a Unix socket."""
+
+    def __init__(self, embedder: EmbeddingService):
+        self.embedder = embedder
+        self.requests = 0
+
+    async def handle_connection(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    messages = json.loads(line)["messages"]
+                    # The model call releases the GIL, so other clients are served meanwhile
+                    vectors = await loop.run_in_executor(None, self.embedder.embed_array, messages)
+                    vectors = vectors.reshape(len(messages), -1)
+                except Exception as exc:
+                    writer.write(json.dumps({"error": str(exc)}).encode("utf-8") + b"\n")
+                else:
+                    writer.write(json.dumps({"rows": vectors.shape[0], "dim": vectors.shape[1]}).encode("utf-8") + b"\n")
+                    writer.write(vectors.astype("<f4", copy=False).tobytes())
+                    self.requests += 1
+                await writer.drain()
+        except ConnectionResetError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, path: str):
+        if os.path.exists(path):
+            os.unlink(path)  # Left behind by a previous daemon
+        server = await asyncio.start_unix_server(self.handle_connection, path=path)
+        print(f"Embedding daemon listening on {path}; export {SOCKET_ENV}={path} to use it.")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep the embedding model loaded and serve it over a Unix socket.")
+    parser.add_argument("--socket", default=os.environ.get(SOCKET_ENV, "/tmp/embedding.sock"), help="Unix socket path to listen on")
+    parser.add_argument("--model", default=MODEL_NAME, help="SentenceTransformer model to serve")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch", help="CPU inference backend")
+    parser.add_argument("--threads", type=int, help="Inference threads (default: the backend's default)")
+    parser.add_argument("--batch-size", type=int, default=256, help="Sentences per model call")
+    parser.add_argument("--cache-size", type=int, default=200000, help="Embeddings kept in the shared LRU cache")
+    parser.add_argument("--embedding-store", help="Precomputed embedding store consulted before the model (see embeddingStore.py)")
+    args = parser.parse_args()
+
+    store = None
+    if args.embedding_store:
+        from embeddingStore import EmbeddingStore
+        store = EmbeddingStore(args.embedding_store)
+    daemon = EmbeddingDaemon(EmbeddingService(load_model(args.model, args.backend, args.threads), cache_size=args.cache_size,
+                                              batch_size=args.batch_size, store=store))
+    try:
+        asyncio.run(daemon.serve(args.socket))
+    except KeyboardInterrupt:
+        pass
+    stats = daemon.embedder.stats()
+    print(f"Served {daemon.requests} requests; {stats['encoded']} of {stats['messages']} messages encoded, "
+          f"hit ratio {stats['hit_ratio']:.1%}.")
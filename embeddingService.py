@@ -0,0 +1,185 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from ingestMetrics import METRICS, RateLimitedSummary
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+SOCKET_ENV = "EMBEDDING_SOCKET"  # Path of a running embeddingDaemon to use instead of a local model
+BACKEND_ENV = "EMBEDDING_BACKEND"  # Default inference backend, see BACKENDS
+THREADS_ENV = "EMBEDDING_THREADS"  # Default inference thread count
+
+# torch: fp32 PyTorch reference; int8: PyTorch with dynamically quantized Linear layers;
+# onnx / onnx-int8: ONNX Runtime running the fp32 or the quantized export of the model
+BACKENDS = ("torch", "int8", "onnx", "onnx-int8")
+ONNX_INT8_FILE = "onnx/model_quint8_avx2.onnx"  # Quantized export shipped in the model repository
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def load_model(name: str = MODEL_NAME, backend: str = "torch", threads: int = None):
+    """Load a SentenceTransformer model in this process on the given CPU backend."""
+    from sentence_transformers import SentenceTransformer
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+    if backend.startswith("onnx"):
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        model_kwargs = {"provider": "CPUExecutionProvider", "session_options": options}
+        if backend == "onnx-int8":
+            model_kwargs["file_name"] = ONNX_INT8_FILE
+        return SentenceTransformer(name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+    import torch
+    if threads:
+        torch.set_num_threads(threads)
+    model = SentenceTransformer(name, device="cpu")
+    if backend == "int8":
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def get_model(name: str = MODEL_NAME, backend: str = None, threads: int = None):
+    """Return the shared embedding model, loading it on first use.
+
+    The backend and thread count default to $EMBEDDING_BACKEND and
+    $EMBEDDING_THREADS. When $EMBEDDING_SOCKET names the socket of a running
+    embeddingDaemon, a client for it is returned instead, so short-lived tools
+    never load torch.
+    """
+    backend = backend or os.environ.get(BACKEND_ENV, "torch")
+    threads = threads or int(os.environ.get(THREADS_ENV, 0)) or None
+    with _models_lock:
+        model = _models.get((name, backend, threads))
+        if model is None:
+            socket_path = os.environ.get(SOCKET_ENV)
+            if socket_path and os.path.exists(socket_path):
+                from embeddingDaemon import EmbeddingClient
+                model = EmbeddingClient(socket_path)
+            else:
+                model = load_model(name, backend, threads)
+            _models[(name, backend, threads)] = model
+        return model
+
+
+def message_key(message: str) -> bytes:
+    """Return the cache key for a log message."""
+    return hashlib.blake2b(message.encode("utf-8"), digest_size=16).digest()
+
+
+class EmbeddingService:
+    """Embed log messages in batches with in-batch dedupe and an LRU embedding cache.
+
+    Identical messages in a batch are encoded once, and vectors are kept in a
+    bounded LRU cache keyed by message hash so repeated messages never reach
+    the model again. An optional precomputed EmbeddingStore is consulted
+    before the model, so messages it covers are never encoded at all. Without
+    an explicit model the shared one from get_model() is loaded on first miss.
+    """
+
+    def __init__(self, model=None, cache_size: int = 50000, batch_size: int = 256, verbose: bool = False, store=None,
+                 report_interval: float = 10.0):
+        self._model = model
+        self.store = store
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self.verbose = verbose
+
+        self._cache = OrderedDict()  # message hash -> float32 vector
+        self._lock = threading.Lock()
+
+        self.messages = 0
+        self.hits = 0
+        self.store_hits = 0
+        self.encoded = 0
+        self.encode_seconds = 0.0
+        self.last_batch = {}
+        self._summary = RateLimitedSummary("embed", report_interval) if verbose else None
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = get_model()
+        return self._model
+
+    def embed(self, messages):
+        """Return one embedding (a list of floats) per message."""
+        return self.embed_array(messages).tolist()
+
+    def embed_array(self, messages) -> np.ndarray:
+        """Return the embeddings of the messages as a float32 matrix, one row per message."""
+        keys = [message_key(message) for message in messages]
+        vectors = {}
+        missing = {}  # message hash -> message, deduplicated within the batch
+
+        with self._lock:
+            for key, message in zip(keys, messages):
+                if key in vectors or key in missing:
+                    continue
+                vector = self._cache.get(key)
+                if vector is not None:
+                    self._cache.move_to_end(key)
+                    vectors[key] = vector
+                else:
+                    missing[key] = message
+
+        store_hits = 0
+        if missing and self.store is not None:  # Zero-copy views into the memory-mapped store
+            for key, vector in self.store.lookup(list(missing)).items():
+                vectors[key] = vector
+                del missing[key]
+                store_hits += 1
+
+        encode_seconds = 0.0
+        if missing:
+            start = time.perf_counter()
+            encoded = self.model.encode(list(missing.values()), batch_size=self.batch_size, convert_to_numpy=True)
+            encode_seconds = time.perf_counter() - start
+            METRICS.observe("stage_seconds", encode_seconds, stage="encode")
+            METRICS.observe("batch_rows", len(missing), stage="encode")
+            with self._lock:
+                for key, vector in zip(missing, encoded):
+                    vectors[key] = vector
+                    self._cache[key] = vector
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        hits = len(messages) - len(missing)
+        with self._lock:
+            self.messages += len(messages)
+            self.hits += hits
+            self.store_hits += store_hits
+            self.encoded += len(missing)
+            self.encode_seconds += encode_seconds
+            self.last_batch = {
+                "messages": len(messages),
+                "encoded": len(missing),
+                "hit_ratio": hits / len(messages) if messages else 0.0,
+                "encode_ms": 1000 * encode_seconds,
+            }
+        counts = {"cache": hits - store_hits, "store": store_hits, "model": len(missing)}
+        for source, count in counts.items():
+            if count:
+                METRICS.inc("embedding_lookups_total", count, source=source)
+        if self._summary is not None:
+            self._summary.record(counts, encode_seconds)
+
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([vectors[key] for key in keys]).astype(np.float32, copy=False)
+
+    def stats(self) -> dict:
+        """Return cache hit ratio and model encode time counters."""
+        return {
+            "messages": self.messages,
+            "encoded": self.encoded,
+            "hit_ratio": self.hits / self.messages if self.messages else 0.0,
+            "store_hits": self.store_hits,
+            "encode_seconds": self.encode_seconds,
+            "cache_entries": len(self._cache),
+        }
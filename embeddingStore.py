@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import numpy as np
+from embeddingService import get_model, message_key
+
+# Store layout in its directory:
+#   meta.json    dim, dtype and row count
+#   vectors.bin  row-major matrix of embeddings (float32 or float16)
+#   keys.npy     sorted uint64 message hashes
+#   rows.npy     row of vectors.bin holding each key's embedding
+
+
+def store_key(key: bytes) -> int:
+    """Reduce an EmbeddingService message hash to the store's 64-bit key."""
+    return int.from_bytes(key[:8], "little")
+
+
+class EmbeddingStore:
+    """Read-only, memory-mapped embedding matrix with a hash -> row index.
+
+    The files are mapped read-only, so any number of ingest processes can
+    open the same store and share its pages through the OS page cache.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json")) as handle:
+            self.meta = json.load(handle)
+        self.dim = self.meta["dim"]
+        self.count = self.meta["count"]
+        self.vectors = np.memmap(os.path.join(directory, "vectors.bin"), dtype=self.meta["dtype"], mode="r",
+                                 shape=(self.count, self.dim)) if self.count else np.empty((0, self.dim), dtype=self.meta["dtype"])
+        self.keys = np.load(os.path.join(directory, "keys.npy"), mmap_mode="r")
+        self.rows = np.load(os.path.join(directory, "rows.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return len(self.keys)
+
+    def find_rows(self, keys) -> np.ndarray:
+        """Return the store row for each message hash, or -1 where it is missing."""
+        wanted = np.fromiter((store_key(key) for key in keys), dtype=np.uint64, count=len(keys))
+        if not len(self.keys):
+            return np.full(len(wanted), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.keys, wanted), len(self.keys) - 1)
+        return np.where(self.keys[positions] == wanted, self.rows[positions], -1)
+
+    def get(self, message: str):
+        """Return a zero-copy view of a message's stored embedding, or None."""
+        row = self.find_rows([message_key(message)])[0]
+        return self.vectors[row] if row >= 0 else None
+
+    def lookup(self, keys) -> dict:
+        """Return {message hash: embedding view} for the hashes present in the store."""
+        return {key: self.vectors[row] for key, row in zip(keys, self.find_rows(keys).tolist()) if row >= 0}
+
+
+class EmbeddingStoreWriter:
+    """Build or extend an embedding store; rows are appended, the index is rewritten on close."""
+
+    def __init__(self, directory: str, dim: int = 384, dtype: str = "float32"):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        meta_path = os.path.join(directory, "meta.json")
+        if os.path.exists(meta_path):
+            existing = EmbeddingStore(directory)
+            self.dim, self.dtype, self.count = existing.dim, existing.meta["dtype"], existing.count
+            self.index = dict(zip(existing.keys.tolist(), existing.rows.tolist()))
+        else:
+            self.dim, self.dtype, self.count = dim, np.dtype(dtype).name, 0
+            self.index = {}
+        self.handle = open(os.path.join(directory, "vectors.bin"), "r+b" if self.count else "wb")
+        self.handle.truncate(self.count * self.dim * np.dtype(self.dtype).itemsize)
+        self.handle.seek(0, os.SEEK_END)
+
+    def __contains__(self, message: str) -> bool:
+        return store_key(message_key(message)) in self.index
+
+    def add(self, messages, vectors):
+        """Append embeddings for messages that are not stored yet."""
+        vectors = np.asarray(vectors).astype(self.dtype, copy=False).reshape(-1, self.dim)
+        new_rows = []
+        for message, vector in zip(messages, vectors):
+            key = store_key(message_key(message))
+            if key not in self.index:
+                self.index[key] = self.count + len(new_rows)
+                new_rows.append(vector)
+        if new_rows:
+            self.handle.write(np.stack(new_rows).tobytes())
+            self.count += len(new_rows)
+
+    def close(self):
+        """Flush the vectors and atomically publish the new index and metadata."""
+        self.handle.close()
+        keys = np.fromiter(self.index.keys(), dtype=np.uint64, count=len(self.index))
+        rows = np.fromiter(self.index.values(), dtype=np.int64, count=len(self.index))
+        order = np.argsort(keys)
+        for name, array in (("keys.npy", keys[order]), ("rows.npy", rows[order])):
+            with open(os.path.join(self.directory, name + ".tmp"), "wb") as handle:
+                np.save(handle, array)
+            os.replace(os.path.join(self.directory, name + ".tmp"), os.path.join(self.directory, name))
+        with open(os.path.join(self.directory, "meta.json.tmp"), "w") as handle:
+            json.dump({"dim": self.dim, "dtype": self.dtype, "count": self.count}, handle)
+        os.replace(os.path.join(self.directory, "meta.json.tmp"), os.path.join(self.directory, "meta.json"))
+
+
+def build_store(directory: str, texts, model=None, dtype: str = "float32", batch_size: int = 1024) -> int:
+    """Embed the distinct templates of the given texts and add them to a store."""
+    from logTemplater import extract_template
+    model = model or get_model()
+    writer = EmbeddingStoreWriter(directory, model.get_sentence_embedding_dimension(), dtype)
+    added = 0
+    try:
+        pending = {}
+        for text in texts:
+            template, _ = extract_template(text)
+            if template not in writer and template not in pending:
+                pending[template] = None
+            if len(pending) >= batch_size:
+                writer.add(list(pending), model.encode(list(pending), batch_size=batch_size, convert_to_numpy=True))
+                added, pending = added + len(pending), {}
+        if pending:
+            writer.add(list(pending), model.encode(list(pending), batch_size=batch_size, convert_to_numpy=True))
+            added += len(pending)
+    finally:
+        writer.close()
+    return added
+
+
+def read_texts(paths, field: str):
+    """Yield the message field of JSON-lines files (e.g. exportCollection output or logStreamer output)."""
+    for path in paths:
+        with open(path, encoding="utf-8") as handle:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)[field]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or inspect a memory-mapped embedding store.")
+    parser.add_argument("directory", help="Store directory")
+    parser.add_argument("--from-jsonl", nargs="+", help="JSON-lines files whose messages should be embedded into the store")
+    parser.add_argument("--field", default="raw_log", help="Message field of the JSON-lines records")
+    parser.add_argument("--from-templates", action="store_true", help="Embed every predefined message of streamerToMilvus.ERRORS")
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32", help="Storage precision of a new store")
+    args = parser.parse_args()
+
+    if args.from_jsonl or args.from_templates:
+        from streamerToMilvus import ERRORS
+        texts = read_texts(args.from_jsonl, args.field) if args.from_jsonl else (
+            message for levels in ERRORS.values() for messages in levels.values() for message in messages)
+        added = build_store(args.directory, texts, dtype=args.dtype)
+        print(f"Added {added} embeddings to '{args.directory}'.")
+
+    store = EmbeddingStore(args.directory)
+    size = store.vectors.nbytes if store.count else 0
+    print(f"Store '{args.directory}': {len(store)} embeddings, dim {store.dim}, {store.meta['dtype']}, {size / 2 ** 20:.1f} MB of vectors.")
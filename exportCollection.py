@@ -0,0 +1,241 @@
+import argparse
+import json
+import os
+import time
+from pymilvus import Collection, DataType
+from milvusClient import add_milvus_arguments, connect_from_args
+
+VECTOR_TYPES = {DataType.FLOAT_VECTOR, DataType.BINARY_VECTOR, getattr(DataType, "FLOAT16_VECTOR", None)} - {None}
+
+# .npy files get a fixed 128-byte header so the row count can be rewritten in place
+NPY_HEADER_BYTES = 128
+
+def npy_header(rows: int, dim: int) -> bytes:
+    """Return a fixed-size .npy (version 1.0) header for a float32 matrix."""
+    header = repr({"descr": "<f4", "fortran_order": False, "shape": (rows, dim)}).encode("latin1")
+    header = header.ljust(NPY_HEADER_BYTES - 10 - 1) + b"\n"
+    return b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header
+
+class VectorFile:
+    """Append-only float32 .npy writer that never holds more than one page in memory."""
+
+    def __init__(self, path: str, dim: int, rows: int = 0):
+        self.path, self.dim, self.rows = path, dim, rows
+        if rows:
+            self.handle = open(path, "r+b")
+            self.handle.truncate(NPY_HEADER_BYTES + rows * dim * 4)  # Drop anything written after the last checkpoint
+            self.handle.seek(0, os.SEEK_END)
+        else:
+            self.handle = open(path, "wb")
+            self.handle.write(npy_header(0, dim))
+
+    def append(self, vectors):
+        import numpy as np
+        block = np.asarray(vectors, dtype="<f4").reshape(-1, self.dim)
+        self.handle.write(block.tobytes())
+        self.rows += len(block)
+
+    def sync(self):
+        """Rewrite the header with the current row count and flush."""
+        self.handle.seek(0)
+        self.handle.write(npy_header(self.rows, self.dim))
+        self.handle.seek(0, os.SEEK_END)
+        self.handle.flush()
+
+    def close(self):
+        self.sync()
+        self.handle.close()
+
+class JsonlFile:
+    """Append-only JSON-lines writer."""
+
+    def __init__(self, path: str, size: int = 0):
+        self.path = path
+        self.handle = open(path, "r+b" if size else "wb")
+        self.handle.truncate(size)  # Drop anything written after the last checkpoint
+        self.handle.seek(0, os.SEEK_END)
+        self.size = size
+
+    def append(self, rows):
+        self.handle.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode("utf-8"))
+
+    def sync(self) -> bool:
+        """Flush; every appended row is then safe to checkpoint."""
+        self.handle.flush()
+        self.size = self.handle.tell()
+        return True
+
+    def state(self) -> dict:
+        return {"jsonl_bytes": self.size}
+
+    def close(self):
+        self.handle.close()
+
+def arrow_schema(schema_fields, names):
+    """Return the Arrow schema of the named Milvus scalar fields and the fields written as JSON text.
+
+    JSON, ARRAY and other fields without a fixed Arrow type are stored as JSON strings.
+    """
+    import pyarrow as pa
+    arrow_types = {
+        DataType.BOOL: pa.bool_(),
+        DataType.INT8: pa.int8(),
+        DataType.INT16: pa.int16(),
+        DataType.INT32: pa.int32(),
+        DataType.INT64: pa.int64(),
+        DataType.FLOAT: pa.float32(),
+        DataType.DOUBLE: pa.float64(),
+        DataType.VARCHAR: pa.string(),
+    }
+    dtypes = {field.name: field.dtype for field in schema_fields}
+    json_fields = [name for name in names if dtypes.get(name) not in arrow_types]
+    return pa.schema([(name, arrow_types.get(dtypes.get(name), pa.string())) for name in names]), json_fields
+
+class ParquetFile:
+    """Parquet writer emitting one row group per page into numbered part files.
+
+    Every page is written with the same explicit ``schema`` (see arrow_schema),
+    so a page whose column is all null still matches the part's schema.
+    A Parquet file is unreadable until its footer is written, so rows only
+    count as exported once the part holding them is closed.
+    """
+
+    def __init__(self, path: str, part: int = 0, pages_per_part: int = 100, schema=None, json_fields=()):
+        self.base = path[:-len(".parquet")] if path.endswith(".parquet") else path
+        self.part = part
+        self.pages_per_part = pages_per_part
+        self.schema = schema
+        self.json_fields = json_fields
+        self.writer = None
+        self.pages = 0
+
+    @property
+    def path(self) -> str:
+        return f"{self.base}-{self.part:05d}.parquet"
+
+    def append(self, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        for row in rows:
+            for field in self.json_fields:
+                if row.get(field) is not None:
+                    row[field] = json.dumps(row[field], ensure_ascii=False)
+        table = pa.Table.from_pylist(rows, schema=self.schema)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+        self.pages += 1
+
+    def sync(self) -> bool:
+        """Close the current part once it is full; returns True when every appended row is in a closed part."""
+        if self.pages >= self.pages_per_part:
+            self.close()
+        return self.writer is None
+
+    def state(self) -> dict:
+        return {"parts": self.part}
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer, self.pages = None, 0
+            self.part += 1
+
+def load_checkpoint(path: str) -> dict:
+    if os.path.exists(path):
+        with open(path) as handle:
+            return json.load(handle)
+    return {}
+
+def save_checkpoint(path: str, checkpoint: dict):
+    """Write the checkpoint atomically."""
+    with open(path + ".tmp", "w") as handle:
+        json.dump(checkpoint, handle)
+    os.replace(path + ".tmp", path)
+
+def export_collection(collection_name: str, output: str, output_format: str = "jsonl", fields=None, vectors: bool = False,
+                      expr: str = "", batch_size: int = 1000, resume: bool = False, partition_names=None) -> int:
+    """Stream every matching row of a collection (or of some of its partitions) to disk in primary-key order, page by page."""
+    collection = Collection(collection_name)
+    collection.load(partition_names=partition_names)  # Only the exported partitions, so released ones stay out of memory
+    schema_fields = collection.schema.fields
+    primary_key = next(field.name for field in schema_fields if field.is_primary)
+    vector_field = next((field for field in schema_fields if field.dtype in VECTOR_TYPES), None)
+    scalar_fields = fields or [field.name for field in schema_fields if field.dtype not in VECTOR_TYPES]
+    if primary_key not in scalar_fields:
+        scalar_fields = [primary_key] + scalar_fields
+    if vectors and (vector_field is None or vector_field.dtype != DataType.FLOAT_VECTOR):
+        raise ValueError(f"Collection '{collection_name}' has no FLOAT_VECTOR field to export")
+
+    checkpoint_path = output + ".checkpoint"
+    checkpoint = load_checkpoint(checkpoint_path) if resume else {}
+    exported = checkpoint.get("rows", 0)
+    if output_format == "parquet":
+        schema, json_fields = arrow_schema(schema_fields, scalar_fields)
+        rows_file = ParquetFile(output, checkpoint.get("parts", 0), schema=schema, json_fields=json_fields)
+    else:
+        rows_file = JsonlFile(output, checkpoint.get("jsonl_bytes", 0))
+    vector_file = VectorFile(output + ".npy", vector_field.params["dim"], exported) if vectors else None
+
+    # Resume strictly after the last exported primary key
+    last_pk = checkpoint.get("last_pk")
+    if last_pk is not None:
+        resume_expr = f"{primary_key} > {last_pk}" if isinstance(last_pk, int) else f"{primary_key} > {json.dumps(last_pk)}"
+        expr = f"({expr}) && {resume_expr}" if expr else resume_expr
+        print(f"Resuming '{collection_name}' after {primary_key} {last_pk} ({exported} rows already exported)")
+
+    def save(rows: int, pk):
+        save_checkpoint(checkpoint_path, {"rows": rows, "last_pk": pk, **rows_file.state()})
+
+    output_fields = scalar_fields + ([vector_field.name] if vectors else [])
+    iterator = collection.query_iterator(batch_size=batch_size, expr=expr, output_fields=output_fields, partition_names=partition_names)
+    start = time.time()
+    completed = False
+    try:
+        while True:
+            page = iterator.next()
+            if not page:
+                completed = True
+                break
+            if vector_file is not None:
+                vector_file.append([row.pop(vector_field.name) for row in page])
+            rows_file.append([{field: row[field] for field in scalar_fields} for row in page])
+            exported += len(page)
+            last_pk = page[-1][primary_key]
+
+            # Checkpoint only once the page is durably on disk
+            durable = rows_file.sync()
+            if vector_file is not None:
+                vector_file.sync()
+            if durable:
+                save(exported, last_pk)
+    finally:
+        iterator.close()
+        rows_file.close()
+        if vector_file is not None:
+            vector_file.close()
+    if completed:
+        save(exported, last_pk)
+
+    elapsed = time.time() - start
+    print(f"Exported {exported} rows from '{collection_name}'{' with vectors in ' + vector_file.path if vector_file else ''} "
+          f"({exported / max(elapsed, 1e-9):.0f} rows/sec this run)")
+    return exported
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream a Milvus collection to JSONL or Parquet (plus .npy vectors).")
+    parser.add_argument("collection", help="Collection to export")
+    parser.add_argument("output", help="Output file for the scalar fields")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl", help="Format of the scalar fields")
+    parser.add_argument("--fields", nargs="+", help="Scalar fields to export (default: all of them)")
+    parser.add_argument("--vectors", action="store_true", help="Also export embeddings to <output>.npy, row-aligned with the output")
+    parser.add_argument("--expr", default="", help="Only export rows matching this filter")
+    parser.add_argument("--partitions", nargs="+", help="Only export these partitions")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows fetched per page")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted export from its checkpoint")
+    add_milvus_arguments(parser)
+    args = parser.parse_args()
+
+    connect_from_args(args)
+    export_collection(args.collection, args.output, args.format, args.fields, args.vectors, args.expr, args.batch_size, args.resume,
+                      args.partitions)
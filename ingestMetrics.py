@@ -0,0 +1,317 @@
+import bisect
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRIC_PREFIX = "logingest_"
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000)
+
+# name -> (type, help text, histogram buckets)
+METRICS_HELP = {
+    "stage_seconds": ("histogram", "Latency of one unit of work in a pipeline stage", LATENCY_BUCKETS),
+    "batch_rows": ("histogram", "Rows handled per batch by a pipeline stage", SIZE_BUCKETS),
+    "rows_total": ("counter", "Rows processed by a pipeline stage", None),
+    "errors_total": ("counter", "Failures in a pipeline stage", None),
+    "retries_total": ("counter", "Retried operations in a pipeline stage", None),
+    "embedding_lookups_total": ("counter", "Embedding lookups by where the vector came from", None),
+}
+
+
+class MetricsRegistry:
+    """Thread-safe counters and fixed-bucket histograms keyed by metric name and labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        buckets = METRICS_HELP[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(buckets) + 2)
+            histogram[bisect.bisect_left(buckets, value)] += 1
+            histogram[-1] += value
+
+    @contextmanager
+    def timer(self, stage: str, rows: int = None):
+        """Time a block as one unit of work of a stage, counting a failure if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc("errors_total", stage=stage)
+            raise
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - start, stage=stage)
+        if rows is not None:
+            self.inc("rows_total", rows, stage=stage)
+            self.observe("batch_rows", rows, stage=stage)
+
+    def snapshot(self, reset: bool = False) -> dict:
+        """Return every metric as JSON-serializable data, optionally clearing them (to forward deltas)."""
+        with self._lock:
+            counters, histograms = self._counters, self._histograms
+            if reset:
+                self._counters, self._histograms = {}, {}
+            else:
+                counters, histograms = dict(counters), {key: list(value) for key, value in histograms.items()}
+        return {
+            "counters": [[name, dict(labels), value] for (name, labels), value in counters.items()],
+            "histograms": [[name, dict(labels), value] for (name, labels), value in histograms.items()],
+        }
+
+    def merge(self, snapshot: dict):
+        """Add a snapshot taken in another process to these metrics."""
+        with self._lock:
+            for name, labels, value in snapshot["counters"]:
+                key = (name, tuple(sorted(labels.items())))
+                self._counters[key] = self._counters.get(key, 0) + value
+            for name, labels, value in snapshot["histograms"]:
+                key = (name, tuple(sorted(labels.items())))
+                histogram = self._histograms.setdefault(key, [0] * len(value))
+                for i, count in enumerate(value):
+                    histogram[i] += count
+
+    def render_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS_HELP.items():
+            series = [entry for entry in snapshot["counters" if kind == "counter" else "histograms"] if entry[0] == name]
+            if not series:
+                continue
+            lines += [f"# HELP {METRIC_PREFIX}{name} {help_text}", f"# TYPE {METRIC_PREFIX}{name} {kind}"]
+            for _, labels, value in series:
+                if kind == "counter":
+                    lines.append(f"{METRIC_PREFIX}{name}{format_labels(labels)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(buckets) + ["+Inf"], value[:-1]):
+                    cumulative += count
+                    lines.append(f"{METRIC_PREFIX}{name}_bucket{format_labels({**labels, 'le': bound})} {cumulative}")
+                lines.append(f"{METRIC_PREFIX}{name}_sum{format_labels(labels)} {value[-1]}")
+                lines.append(f"{METRIC_PREFIX}{name}_count{format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+METRICS = MetricsRegistry()  # Process-wide registry used by the ingest modules
+
+
+class RateLimitedSummary:
+    """Aggregate per-event counts and print at most one summary line per interval."""
+
+    def __init__(self, label: str, interval: float = 10.0):
+        self.label = label
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._reset(time.monotonic())
+
+    def _reset(self, now: float):
+        self._since, self._events, self._seconds, self._counts = now, 0, 0.0, Counter()
+
+    def record(self, counts: dict, seconds: float = 0.0):
+        """Record one batch: item counts by key (e.g. rows per collection) handled in ``seconds``."""
+        with self._lock:
+            self._events += 1
+            self._seconds += seconds
+            self._counts.update(counts)
+            line = self._take() if time.monotonic() - self._since >= self.interval else None
+        if line:
+            print(line)
+
+    def flush(self):
+        """Print whatever was recorded since the last summary."""
+        with self._lock:
+            line = self._take() if self._events else None
+        if line:
+            print(line)
+
+    def _take(self) -> str:
+        now = time.monotonic()
+        elapsed = max(now - self._since, 1e-9)
+        total = sum(self._counts.values())
+        top = ", ".join(f"{key} {count}" for key, count in self._counts.most_common(5))
+        line = (f"[{self.label}] {total} in {self._events} batches over {elapsed:.1f} s ({total / elapsed:.0f}/sec, "
+                f"avg {1000 * self._seconds / self._events:.1f} ms/batch): {top}")
+        self._reset(now)
+        return line
+
+
+class SamplingProfiler:
+    """Sample every thread's stack at a fixed interval and write collapsed stacks for flame graphs."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples = Counter()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def write(self, path: str):
+        """Write the samples in collapsed-stack format (input for flamegraph.pl or speedscope)."""
+        with open(path, "w") as handle:
+            for stack, count in self.samples.most_common():
+                handle.write(f"{stack} {count}\n")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = METRICS
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes are not worth a line each
+
+
+def serve_metrics(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve /metrics in the Prometheus format from a background thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def forward_metrics(queue, interval: float = 5.0):
+    """From a worker process, send metric deltas to the parent's collect_metrics() thread."""
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            queue.put(METRICS.snapshot(reset=True))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+
+    def close():
+        stop.set()
+        thread.join()
+        queue.put(METRICS.snapshot(reset=True))
+    return close
+
+
+def collect_metrics(queue):
+    """Merge metric deltas forwarded by worker processes into this process's registry."""
+    def run():
+        while True:
+            snapshot = queue.get()
+            if snapshot is None:
+                break
+            METRICS.merge(snapshot)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def add_metrics_arguments(parser):
+    """Add the shared instrumentation options to a CLI."""
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this port")
+    parser.add_argument("--metrics-json", help="Append a JSON snapshot of the metrics to this file every --metrics-interval seconds")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="Seconds between JSON snapshots and progress summaries")
+    parser.add_argument("--sample-profile", help="Write sampled stacks to this file on exit; SIGUSR2 toggles sampling while running")
+    parser.add_argument("--sample-profile-from-start", action="store_true", help="Sample from startup instead of waiting for SIGUSR2")
+
+
+class MetricsSession:
+    """Start the exporters and profiler selected on the command line; close() stops them."""
+
+    def __init__(self, args):
+        self.args = args
+        self.server = serve_metrics(args.metrics_port) if args.metrics_port else None
+        self.profiler = SamplingProfiler() if args.sample_profile else None
+        self._stop = threading.Event()
+        self._dumper = None
+        if args.metrics_json:
+            self._dumper = threading.Thread(target=self._dump_json, daemon=True)
+            self._dumper.start()
+        if self.profiler is not None:
+            if args.sample_profile_from_start:
+                self.profiler.start()
+            if hasattr(signal, "SIGUSR2") and threading.current_thread() is threading.main_thread():
+                signal.signal(signal.SIGUSR2, lambda signum, frame: self.toggle_profiler())
+
+    def toggle_profiler(self):
+        if self.profiler.running:
+            self.profiler.stop()
+            self.profiler.write(self.args.sample_profile)
+            print(f"Profiler stopped; {sum(self.profiler.samples.values())} samples written to {self.args.sample_profile}")
+        else:
+            self.profiler.start()
+            print("Profiler started")
+
+    def _write_json(self):
+        with open(self.args.metrics_json, "a") as handle:
+            handle.write(json.dumps({"time": time.time(), **METRICS.snapshot()}) + "\n")
+
+    def _dump_json(self):
+        while not self._stop.wait(self.args.metrics_interval):
+            self._write_json()
+
+    def close(self):
+        self._stop.set()
+        if self._dumper is not None:
+            self._dumper.join()
+            self._write_json()
+        if self.profiler is not None and self.profiler.running:
+            self.profiler.stop()
+        if self.profiler is not None and self.profiler.samples:
+            self.profiler.write(self.args.sample_profile)
+        if self.server is not None:
+            self.server.shutdown()
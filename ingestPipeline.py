@@ -0,0 +1,190 @@
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import time
+from batchWriter import BatchingLogWriter
+from embeddingService import BACKENDS, EmbeddingService, get_model
+from embeddingStore import EmbeddingStore
+from ingestMetrics import METRICS, MetricsSession, add_metrics_arguments, collect_metrics, forward_metrics
+from logIds import WORKER_ENV, SnowflakeIdAllocator, configured_worker_id
+from logTemplater import extract_template
+from milvusClient import add_milvus_arguments, connect, connect_from_args, endpoints_from_args
+import streamerToMilvus
+
+def put_timed(queue, item, queue_name: str):
+    """Put an item on a bounded queue, recording how long backpressure held the producer."""
+    start = time.perf_counter()
+    queue.put(item)
+    METRICS.observe("stage_seconds", time.perf_counter() - start, stage="queue_wait", queue=queue_name)
+
+def generate_stage(collections, logs_per_collection: int, chunk_size: int, embed_queue, worker_id: int, metrics_queue=None):
+    """Generate and template logs for several collections, interleaving them chunk by chunk."""
+    close_metrics = forward_metrics(metrics_queue) if metrics_queue is not None else None
+    id_allocator = SnowflakeIdAllocator(worker_id)  # Ids are fixed here so retries downstream stay idempotent
+    remaining = {collection_name: logs_per_collection for collection_name in collections}
+    while remaining:
+        for collection_name in list(remaining):
+            collection_type = collections[collection_name]
+            count = min(chunk_size, remaining[collection_name])
+            chunk = []
+            with METRICS.timer("generate", count):
+                for _ in range(count):
+                    log_entry = streamerToMilvus.generate_log(collection_type)
+                    log_entry["log_id"] = id_allocator.allocate(log_entry)
+                    log_entry["template"], log_entry["params"] = extract_template(log_entry["message"])
+                    chunk.append(log_entry)
+            put_timed(embed_queue, (collection_name, chunk), "embed")  # Blocks while the embed stage is behind
+            remaining[collection_name] -= count
+            if not remaining[collection_name]:
+                del remaining[collection_name]
+    if close_metrics:
+        close_metrics()
+
+def embed_stage(embed_queue, write_queue, store_directory: str = None, backend: str = None, batch_size: int = 256, metrics_queue=None):
+    """Embed chunks of templated logs until a None sentinel arrives."""
+    close_metrics = forward_metrics(metrics_queue) if metrics_queue is not None else None
+    model = get_model(backend=backend, threads=1)  # One core per embed worker; the pool provides the parallelism
+    # Each worker maps the store read-only, so its pages are shared between them
+    embedder = EmbeddingService(model, batch_size=batch_size, store=EmbeddingStore(store_directory) if store_directory else None)
+    while True:
+        item = embed_queue.get()
+        if item is None:
+            break
+        collection_name, chunk = item
+        with METRICS.timer("embed", len(chunk)):
+            embeddings = embedder.embed_array([log_entry["template"] for log_entry in chunk])
+        put_timed(write_queue, (collection_name, chunk, embeddings), "write")  # Blocks while Milvus is behind
+    if close_metrics:
+        close_metrics()
+    stats = embedder.stats()
+    print(f"[embed {os.getpid()}] {stats['messages']} messages, {stats['encoded']} encoded, {stats['store_hits']} from the store, "
+          f"hit ratio {stats['hit_ratio']:.1%}, {stats['encode_seconds']:.1f} s in the model")
+
+def write_stage(endpoints, write_queue, max_rows: int, metrics_queue=None, report_interval: float = 10.0):
+    """Insert embedded chunks into Milvus until a None sentinel arrives."""
+    close_metrics = forward_metrics(metrics_queue) if metrics_queue is not None else None
+    connect(endpoints)
+    writer = BatchingLogWriter(max_rows=max_rows, report_interval=report_interval)
+    try:
+        while True:
+            item = write_queue.get()
+            if item is None:
+                break
+            collection_name, chunk, embeddings = item
+            for log_entry, embedding in zip(chunk, embeddings.tolist()):
+                log_entry["embedding"] = embedding
+                writer.add(collection_name, log_entry)
+    finally:
+        writer.close()
+        if close_metrics:
+            close_metrics()
+    stats = writer.stats()
+    print(f"[write {os.getpid()}] {stats['rows_written']} rows at {stats['rows_per_sec']:.0f} rows/sec, "
+          f"avg flush {stats['avg_flush_ms']:.1f} ms")
+
+def wait_for(processes, workers):
+    """Wait for processes to finish, stopping the whole pipeline if any worker fails.
+
+    Every stage is checked, not just the awaited one: a dead downstream worker
+    leaves the upstream stages blocked on a full queue.
+    """
+    while True:
+        for process in processes:
+            process.join(timeout=0.2)
+        for worker in workers:
+            if worker.exitcode not in (None, 0):
+                raise RuntimeError(f"Pipeline worker {worker.name} exited with code {worker.exitcode}")
+        if not any(process.is_alive() for process in processes):
+            return
+
+def stop_stage(stage_queue, count: int, workers):
+    """Send ``count`` None sentinels, checking the workers while the queue is full."""
+    for _ in range(count):
+        while True:
+            try:
+                stage_queue.put(None, timeout=0.2)
+                break
+            except queue.Full:
+                wait_for([], workers)
+
+def run_pipeline(endpoints, generators: int, embedders: int, writers: int,
+                 logs_per_collection: int, chunk_size: int, queue_size: int, max_rows: int, store_directory: str = None,
+                 backend: str = None, embed_batch_size: int = 256, report_interval: float = 10.0):
+    """Stream logs into every collection at once through generate, embed and write stages.
+
+    Generator i allocates log ids as worker $LOG_ID_WORKER + i, so pipelines
+    running at once (on one host or several) need bases at least ``generators``
+    apart. Workers forward their metrics to this process, which merges them into METRICS.
+    They are spawned rather than forked so none inherits this process's Milvus connections.
+    """
+    worker_ids = [configured_worker_id(i) for i in range(generators)]
+    context = mp.get_context("spawn")
+    embed_queue = context.Queue(maxsize=queue_size)
+    write_queue = context.Queue(maxsize=queue_size)
+    metrics_queue = context.Queue()
+    collector = collect_metrics(metrics_queue)
+
+    # Spread the collections over the generator processes so they all stream concurrently
+    names = list(streamerToMilvus.COLLECTIONS)
+    assignments = [{name: streamerToMilvus.COLLECTIONS[name] for name in names[i::generators]} for i in range(generators)]
+    generate_workers = [context.Process(target=generate_stage, name=f"generate-{i}", args=(assigned, logs_per_collection, chunk_size, embed_queue, worker_ids[i], metrics_queue))
+                        for i, assigned in enumerate(assignments) if assigned]
+    embed_workers = [context.Process(target=embed_stage, name=f"embed-{i}", args=(embed_queue, write_queue, store_directory, backend, embed_batch_size, metrics_queue))
+                     for i in range(embedders)]
+    write_workers = [context.Process(target=write_stage, name=f"write-{i}", args=(endpoints, write_queue, max_rows, metrics_queue, report_interval))
+                     for i in range(writers)]
+
+    start = time.time()
+    workers = generate_workers + embed_workers + write_workers
+    for worker in workers:
+        worker.start()
+    try:
+        wait_for(generate_workers, workers)
+        stop_stage(embed_queue, len(embed_workers), workers)
+        wait_for(embed_workers, workers)
+        stop_stage(write_queue, len(write_workers), workers)
+        wait_for(write_workers, workers)
+    except BaseException:
+        for worker in workers:
+            worker.terminate()
+        raise
+    finally:
+        metrics_queue.put(None)
+        collector.join(timeout=5)
+
+    total = logs_per_collection * len(names)
+    elapsed = time.time() - start
+    print(f"Pipeline streamed {total} logs into {len(names)} collections in {elapsed:.1f} s ({total / elapsed:.0f} logs/sec).")
+
+if __name__ == "__main__":
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Stream generated logs into Milvus through a multi-process pipeline.")
+    add_milvus_arguments(parser)
+    parser.add_argument("--generators", type=int, default=min(2, cpus), help="Log generation/parsing processes")
+    parser.add_argument("--embedders", type=int, default=cpus, help="Embedding processes")
+    parser.add_argument("--writers", type=int, default=2, help="Milvus writer processes")
+    parser.add_argument("--logs", type=int, default=1000, help="Logs to stream per collection")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Logs per chunk passed between stages")
+    parser.add_argument("--queue-size", type=int, default=16, help="Chunks each inter-stage queue holds before applying backpressure")
+    parser.add_argument("--max-rows", type=int, default=5000, help="Rows per Milvus insert")
+    parser.add_argument("--embedding-store", help="Precomputed embedding store consulted before the model (see embeddingStore.py)")
+    parser.add_argument("--embedding-backend", choices=BACKENDS, help="CPU inference backend of the embed workers (default: $EMBEDDING_BACKEND or torch)")
+    parser.add_argument("--embedding-batch-size", type=int, default=256, help="Sentences per model call")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    try:
+        configured_worker_id(args.generators - 1)
+    except ValueError as error:
+        parser.error(f"{error}; generator i uses worker id ${WORKER_ENV} + i")
+    metrics = MetricsSession(args)
+
+    connect_from_args(args)
+    streamerToMilvus.create_collections(streamerToMilvus.COLLECTIONS.keys())
+
+    try:
+        run_pipeline(endpoints_from_args(args), args.generators, args.embedders, args.writers,
+                     args.logs, args.chunk_size, args.queue_size, args.max_rows, args.embedding_store,
+                     args.embedding_backend, args.embedding_batch_size, args.metrics_interval)
+    finally:
+        metrics.close()
@@ -0,0 +1,365 @@
+import argparse
+import asyncio
+import glob
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from batchWriter import BatchingLogWriter
+from burstAggregator import BurstAggregator, add_aggregation_arguments
+from embeddingService import EmbeddingService
+from embeddingStore import EmbeddingStore
+from ingestMetrics import METRICS, MetricsSession, add_metrics_arguments
+from logSpool import LogSpool, SpoolDrainer
+from milvusClient import add_milvus_arguments, connect_from_args
+from unifiedStore import UNIFIED_COLLECTION, make_router, safe_family
+import streamerToMilvus
+
+LEVEL_REGEX = re.compile(r"\b(CRITICAL|FATAL|ERROR|WARN(?:ING)?|INFO|DEBUG|TRACE)\b", re.IGNORECASE)
+
+# Aliases accepted for the unified fields described in schema.txt
+FIELD_ALIASES = {
+    "timestamp": ("timestamp", "time", "ts", "@timestamp"),
+    "application": ("service", "application", "app"),
+    "level": ("log_level", "level", "severity"),
+    "host": ("host", "hostname", "node"),
+    "namespace": ("namespace",),
+    "pod_name": ("pod_name", "pod"),
+    "trace_id": ("trace_id", "traceId", "correlation_id"),
+    "log_family": ("log_family", "family"),
+    "message": ("message", "msg", "raw_log", "log"),
+}
+
+def to_millis(value) -> int:
+    """Convert a seconds/milliseconds epoch or ISO-8601 timestamp to epoch milliseconds."""
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            try:
+                parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            except ValueError:
+                return int(time.time() * 1000)
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return int(parsed.timestamp() * 1000)
+    if isinstance(value, (int, float)) and value > 0:
+        return int(value if value > 1e11 else value * 1000)
+    return int(time.time() * 1000)
+
+def normalize_level(level: str) -> str:
+    """Map level spellings onto the levels used by the collections."""
+    level = level.upper()
+    return {"WARN": "WARNING", "FATAL": "CRITICAL"}.get(level, level)
+
+def parse_record(line: str, default_service: str) -> dict:
+    """Parse a JSON or plain-text log line into the unified log fields."""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        record = None
+    if not isinstance(record, dict):
+        record = {}
+
+    fields = {}
+    for field, aliases in FIELD_ALIASES.items():
+        for alias in aliases:
+            if record.get(alias) not in (None, ""):
+                fields[field] = record[alias]
+                break
+
+    message = str(fields.get("message", line))
+    if "level" not in fields:
+        match = LEVEL_REGEX.search(message)
+        fields["level"] = match.group(1) if match else "INFO"
+
+    log_entry = {
+        "timestamp": to_millis(fields.get("timestamp")),
+        "application": str(fields.get("application", default_service))[:100],
+        "level": normalize_level(str(fields["level"]))[:20],
+        "message": message,
+    }
+    for field in ("host", "namespace", "pod_name", "trace_id", "log_family"):  # The writer fills in defaults for missing ones
+        if field in fields:
+            log_entry[field] = str(fields[field])[:100]
+    if "log_family" in log_entry:  # It names the entry's partition in the unified collection
+        log_entry["log_family"] = safe_family(log_entry["log_family"])
+    return log_entry
+
+class SourceStats:
+    """Throughput and lag counters for one log source."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.lines = 0
+        self.bytes = 0
+        self.errors = 0
+        self.lag_ms = 0       # Age of the most recent record when it was read
+        self.pending_bytes = 0  # Unread bytes, for file sources
+        self._reported_lines = 0
+        self._reported_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        """Return the counters and the line rate since the previous snapshot."""
+        now = time.monotonic()
+        rate = (self.lines - self._reported_lines) / max(now - self._reported_at, 1e-9)
+        self._reported_lines, self._reported_at = self.lines, now
+        return {"source": self.name, "lines": self.lines, "bytes": self.bytes, "errors": self.errors,
+                "lines_per_sec": rate, "lag_ms": self.lag_ms, "pending_bytes": self.pending_bytes}
+
+class IngestServer:
+    """Read logs from many files and sockets on one event loop and hand them to a BatchingLogWriter (or a LogSpool)."""
+
+    def __init__(self, writer: BatchingLogWriter, collection_name: str, default_service: str = "unknown",
+                 queue_size: int = 10000, batch_size: int = 1000, poll_interval: float = 0.5, report_interval: float = 10.0,
+                 default_family: str = None):
+        self.writer = writer
+        self.collection_name = collection_name
+        self.default_service = default_service
+        self.default_family = default_family  # log_family of records without one, for the unified collection
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.report_interval = report_interval
+        self.sources = {}
+        self.lost = 0  # Parsed entries the writer never took because a write failed
+        self._queue = asyncio.Queue(maxsize=queue_size)  # Full queue pauses the readers
+
+    def _source(self, name: str) -> SourceStats:
+        stats = self.sources.get(name)
+        if stats is None:
+            stats = self.sources[name] = SourceStats(name)
+        return stats
+
+    async def submit(self, stats: SourceStats, line: bytes):
+        """Parse one raw line and queue it for the writer."""
+        stats.bytes += len(line)
+        text = line.decode("utf-8", errors="replace").strip()
+        if not text:
+            return
+        start = time.perf_counter()
+        try:
+            log_entry = parse_record(text, self.default_service)
+        except Exception:
+            stats.errors += 1
+            METRICS.inc("errors_total", stage="parse")
+            return
+        parsed = time.perf_counter()
+        METRICS.observe("stage_seconds", parsed - start, stage="parse")
+        if self.default_family:
+            log_entry.setdefault("log_family", self.default_family)
+        stats.lines += 1
+        stats.lag_ms = max(0, int(time.time() * 1000) - log_entry["timestamp"])
+        await self._queue.put(log_entry)  # Waits only while the queue is full
+        METRICS.observe("stage_seconds", time.perf_counter() - parsed, stage="queue_wait")
+
+    async def tail_file(self, path: str, from_start: bool = False):
+        """Follow a file like ``tail -F``, reopening it after rotation or truncation."""
+        stats = self._source(f"file:{path}")
+        handle, inode, position, partial = None, None, 0, b""
+        while True:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            if handle is None or stat.st_ino != inode or stat.st_size < position:
+                if handle is not None:
+                    handle.close()
+                    from_start = True  # A rotated or truncated file is read from its beginning
+                handle, inode, partial = open(path, "rb"), stat.st_ino, b""
+                position = 0 if from_start else stat.st_size
+                handle.seek(position)
+
+            chunk = handle.read(1 << 16)
+            stats.pending_bytes = max(0, stat.st_size - position - len(chunk))
+            if not chunk:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            position += len(chunk)
+            lines = (partial + chunk).split(b"\n")
+            partial = lines.pop()
+            for line in lines:
+                await self.submit(stats, line)
+
+    async def read_stream(self, name: str, reader: asyncio.StreamReader):
+        """Read newline-delimited records from a stream until EOF."""
+        stats = self._source(name)
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:  # Line longer than the stream limit
+                stats.errors += 1
+                continue
+            if not line:
+                break
+            await self.submit(stats, line)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve one TCP or Unix socket client."""
+        peer = writer.get_extra_info("peername") or writer.get_extra_info("sockname")
+        try:
+            await self.read_stream(f"socket:{peer}", reader)
+        finally:
+            writer.close()
+
+    async def read_stdin(self):
+        """Read records from standard input."""
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=1 << 20)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        await self.read_stream("stdin", reader)
+
+    async def consume(self):
+        """Move queued entries to the writer in batches, off the event loop."""
+        loop = asyncio.get_running_loop()
+        while True:
+            log_entry = await self._queue.get()
+            if log_entry is None:
+                break
+            batch = [log_entry]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                log_entry = self._queue.get_nowait()
+                if log_entry is None:
+                    await loop.run_in_executor(None, self._write, batch)
+                    return
+                batch.append(log_entry)
+            await loop.run_in_executor(None, self._write, batch)
+
+    def _write(self, batch):
+        """Hand a batch to the writer; if it fails, the entries it did not take are counted as lost and the error re-raised."""
+        METRICS.inc("rows_total", len(batch), stage="parse")
+        METRICS.observe("batch_rows", len(batch), stage="consume")
+        for index, log_entry in enumerate(batch):
+            try:
+                self.writer.add(self.collection_name, log_entry)
+            except Exception as error:
+                METRICS.inc("errors_total", stage="consume")
+                self._record_lost(len(batch) - index, f"writing to '{self.collection_name}' failed ({error})")
+                raise
+
+    def _record_lost(self, count: int, reason: str):
+        self.lost += count
+        METRICS.inc("rows_total", count, stage="lost")
+        print(f"{count} entries were not written: {reason}")
+
+    def stats(self) -> list:
+        """Return per-source counters."""
+        return [stats.snapshot() for stats in self.sources.values()]
+
+    async def report(self):
+        """Periodically print totals and the most lagged sources."""
+        while True:
+            await asyncio.sleep(self.report_interval)
+            snapshots = self.stats()
+            total_rate = sum(snapshot["lines_per_sec"] for snapshot in snapshots)
+            print(f"{len(snapshots)} sources, {total_rate:.0f} lines/sec, queue {self._queue.qsize()}")
+            for snapshot in sorted(snapshots, key=lambda s: (s["pending_bytes"], s["lag_ms"]), reverse=True)[:10]:
+                print(f"  {snapshot['source']}: {snapshot['lines_per_sec']:.0f} lines/sec, lag {snapshot['lag_ms']} ms, "
+                      f"pending {snapshot['pending_bytes']} bytes, {snapshot['errors']} errors")
+
+    async def serve(self, files=(), tcp_host: str = "127.0.0.1", tcp_port: int = None, unix_path: str = None,
+                    stdin: bool = False, from_start: bool = False):
+        """Run all sources until they finish (or forever when listening on a socket)."""
+        consumer = asyncio.create_task(self.consume())
+        reporter = asyncio.create_task(self.report())
+        tasks = [asyncio.create_task(self.tail_file(path, from_start)) for path in files]
+        if stdin:
+            tasks.append(asyncio.create_task(self.read_stdin()))
+        servers = []
+        if tcp_port is not None:
+            servers.append(await asyncio.start_server(self.handle_connection, tcp_host, tcp_port, limit=1 << 20))
+            print(f"Listening for NDJSON on {tcp_host}:{tcp_port}")
+        if unix_path is not None:
+            servers.append(await asyncio.start_unix_server(self.handle_connection, unix_path, limit=1 << 20))
+            print(f"Listening for NDJSON on {unix_path}")
+        sources = asyncio.gather(*tasks, *(server.serve_forever() for server in servers))
+        try:
+            # A failed write ends the consumer; stop then rather than letting the full queue block every reader
+            await asyncio.wait({sources, consumer}, return_when=asyncio.FIRST_COMPLETED)
+            if consumer.done():
+                consumer.result()
+            await sources
+        finally:
+            sources.cancel()
+            await asyncio.gather(sources, return_exceptions=True)
+            for server in servers:
+                server.close()
+            reporter.cancel()
+            await self._stop_consumer(consumer)
+
+    async def _stop_consumer(self, consumer):
+        """Queue the stop marker and wait for the consumer to drain, without waiting on a full queue it no longer reads."""
+        stop = asyncio.ensure_future(self._queue.put(None))
+        await asyncio.wait({stop, consumer}, return_when=asyncio.FIRST_EXCEPTION)
+        stop.cancel()
+        if consumer.done() and not consumer.cancelled() and consumer.exception() is not None:
+            queued = 0
+            while not self._queue.empty():
+                queued += self._queue.get_nowait() is not None
+            if queued:
+                self._record_lost(queued, "they were still queued when the writer failed")
+        await consumer
+
+def expand_paths(patterns):
+    """Expand file glob patterns, keeping literal paths that do not exist yet."""
+    paths = []
+    for pattern in patterns:
+        paths.extend(sorted(glob.glob(pattern)) or [pattern])
+    return paths
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest live log streams into Milvus.")
+    parser.add_argument("--file", action="append", default=[], help="File or glob to tail (repeatable)")
+    parser.add_argument("--tcp-port", type=int, help="Accept newline-delimited JSON on this TCP port")
+    parser.add_argument("--tcp-host", default="127.0.0.1", help="Address for the TCP listener")
+    parser.add_argument("--unix-socket", help="Accept newline-delimited JSON on this Unix socket path")
+    parser.add_argument("--stdin", action="store_true", help="Read records from standard input")
+    parser.add_argument("--from-start", action="store_true", help="Read tailed files from the beginning")
+    parser.add_argument("--collection", default="application_logs", help="Milvus collection to write to")
+    parser.add_argument("--unified", action="store_true",
+                        help=f"Write into the partitioned '{UNIFIED_COLLECTION}' collection; --collection is then the log family of records without one")
+    parser.add_argument("--bucket", choices=["day", "hour"], default="day", help="Time bucket of unified-collection partitions")
+    parser.add_argument("--service", default="unknown", help="Service name for records that do not carry one")
+    parser.add_argument("--report-interval", type=float, default=10.0, help="Seconds between counter reports")
+    parser.add_argument("--embedding-store", help="Precomputed embedding store consulted before the model (see embeddingStore.py)")
+    parser.add_argument("--spool", help="Write records to this local spool first and drain it into Milvus in the background")
+    add_milvus_arguments(parser)
+    add_aggregation_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    if args.collection == UNIFIED_COLLECTION:
+        parser.error(f"use --unified to write into '{UNIFIED_COLLECTION}'")
+    metrics = MetricsSession(args)
+
+    connect_from_args(args)
+    collection_name = UNIFIED_COLLECTION if args.unified else args.collection
+    streamerToMilvus.create_collections([collection_name], unified=args.unified)
+    router = make_router(args.bucket) if args.unified else None
+
+    embedder = EmbeddingService(store=EmbeddingStore(args.embedding_store) if args.embedding_store else None)
+    spool, drainer = None, None
+    if args.spool:
+        # Records are durable once spooled; Milvus writes happen in the drainer and are retried there
+        writer = BatchingLogWriter(embedder.embed, max_latency=3600.0, router=router, upsert=True, retries=1, report_interval=args.report_interval)
+    else:
+        writer = BatchingLogWriter(embedder.embed, router=router, report_interval=args.report_interval)
+    if args.aggregate_window:
+        writer = BurstAggregator(writer, int(args.aggregate_window * 1000), args.aggregate_similarity, embedder.embed)
+    if args.spool:
+        spool = LogSpool(args.spool)
+        drainer = SpoolDrainer(args.spool, writer, report_interval=args.report_interval)  # Bursts are aggregated per drained batch
+        drainer.start()
+    server = IngestServer(spool or writer, collection_name, default_service=args.service, report_interval=args.report_interval,
+                          default_family=safe_family(args.collection) if args.unified else None)
+    try:
+        asyncio.run(server.serve(expand_paths(args.file), args.tcp_host, args.tcp_port, args.unix_socket, args.stdin, args.from_start))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if spool is not None:
+            spool.close()
+            drainer.stop()
+        writer.close()
+        metrics.close()
@@ -0,0 +1,228 @@
+import argparse
+import glob
+import json
+import math
+import os
+import sys
+import time
+import numpy as np
+from ingestMetrics import METRICS, MetricsSession, add_metrics_arguments
+from logTemplater import extract_template
+from milvusClient import add_milvus_arguments, connect_from_args
+from streamerToMilvus import APPLICATIONS, ERRORS, LOG_LEVEL_PROB
+
+# Rate profiles: multiplier of the base rate at time t (seconds) within a period
+RATE_PROFILES = {
+    "constant": lambda t, period, burst: 1.0,
+    "sine": lambda t, period, burst: 1.0 + (burst - 1.0) * 0.5 * (1 + math.sin(2 * math.pi * t / period)),
+    "spike": lambda t, period, burst: burst if (t % period) < period * 0.1 else 1.0,  # burst x rate for 10% of each period
+    "ramp": lambda t, period, burst: 1.0 + (burst - 1.0) * ((t % period) / period),
+}
+
+class LogSampler:
+    """Sample synthetic logs of one family in NumPy batches from precomputed lookup arrays."""
+
+    def __init__(self, collection_type: str, rng: np.random.Generator):
+        self.collection_type = collection_type
+        self.rng = rng
+
+        self.levels = np.array(list(LOG_LEVEL_PROB))
+        self.level_weights = np.array([LOG_LEVEL_PROB[level] for level in self.levels])
+
+        # Applications flattened, with each category's offset and size into the flat array
+        categories = APPLICATIONS[collection_type]
+        self.categories = np.array(list(categories))
+        self.applications = np.array([app for apps in categories.values() for app in apps])
+        self.app_counts = np.array([len(apps) for apps in categories.values()])
+        self.app_offsets = np.concatenate(([0], np.cumsum(self.app_counts)[:-1]))
+
+        # Messages flattened the same way, per level
+        messages = ERRORS[collection_type]
+        self.messages = np.array([message for level in self.levels for message in messages[level]], dtype=object)
+        self.message_counts = np.array([len(messages[level]) for level in self.levels])
+        self.message_offsets = np.concatenate(([0], np.cumsum(self.message_counts)[:-1]))
+
+    def sample(self, size: int, start_ms: int, interval_ms: float = 0.0, uuids: bool = True) -> dict:
+        """Return a columnar batch of ``size`` logs with timestamps starting at ``start_ms``."""
+        rng = self.rng
+        level_index = rng.choice(len(self.levels), size=size, p=self.level_weights)
+        category_index = rng.integers(len(self.categories), size=size)
+        app_index = self.app_offsets[category_index] + (rng.random(size) * self.app_counts[category_index]).astype(np.int64)
+        message_index = self.message_offsets[level_index] + (rng.random(size) * self.message_counts[level_index]).astype(np.int64)
+
+        messages = self.messages[message_index]
+        if uuids:  # Same "[uuid]" suffix as generate_log, drawn from the seeded generator
+            hexes = rng.bytes(16 * size).hex()
+            messages = [f"{message} [{hexes[i:i + 8]}-{hexes[i + 8:i + 12]}-4{hexes[i + 13:i + 16]}-{hexes[i + 16:i + 20]}-{hexes[i + 20:i + 32]}]"
+                        for message, i in zip(messages.tolist(), range(0, 32 * size, 32))]
+        else:
+            messages = messages.tolist()
+
+        return {
+            "log_family": self.collection_type,
+            "timestamp": start_ms + (np.arange(size) * interval_ms).astype(np.int64),
+            "level": self.levels[level_index],
+            "application": self.applications[app_index],
+            "category": self.categories[category_index],
+            "message": messages,
+        }
+
+def to_log_entries(batch: dict):
+    """Convert a columnar batch into log entry dictionaries."""
+    log_family = batch["log_family"]
+    return [
+        {"timestamp": timestamp, "level": level, "application": application, "category": category, "message": message, "log_family": log_family}
+        for timestamp, level, application, category, message in zip(
+            batch["timestamp"].tolist(), batch["level"].tolist(), batch["application"].tolist(), batch["category"].tolist(), batch["message"])
+    ]
+
+def generate_batches(families, rate: float, profile: str = "constant", period: float = 60.0, burst: float = 5.0,
+                     total: int = None, seed: int = 0, tick: float = 0.1, start_ms: int = None):
+    """Yield columnar batches at ``rate`` logs/sec following a burst profile (rate <= 0 means as fast as possible).
+
+    Families take turns batch by batch. With ``start_ms`` set, timestamps advance
+    on a virtual clock so the stream is fully reproducible for a given seed.
+    """
+    rng = np.random.default_rng(seed)
+    samplers = [LogSampler(family, rng) for family in families]
+    emitted, turn = 0, 0
+    started = time.monotonic()
+    virtual_ms = start_ms
+    while total is None or emitted < total:
+        elapsed = time.monotonic() - started
+        if rate > 0:
+            current_rate = rate * RATE_PROFILES[profile](elapsed, period, burst)
+            size = max(1, int(round(current_rate * tick)))
+        else:
+            current_rate, size = 0.0, 10000
+        if total is not None:
+            size = min(size, total - emitted)
+
+        interval_ms = 1000.0 / current_rate if current_rate else 0.0
+        batch_start = virtual_ms if virtual_ms is not None else int(time.time() * 1000)
+        with METRICS.timer("generate", size):
+            batch = samplers[turn % len(samplers)].sample(size, batch_start, interval_ms)
+        yield batch
+        emitted += size
+        turn += 1
+        if virtual_ms is not None:
+            virtual_ms += int(size * interval_ms) or 1
+
+        if rate > 0:  # Pace to the tick boundary
+            delay = started + (int(elapsed / tick) + 1) * tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+def write_dataset(directory: str, batches, embedder, rows_per_part: int = 50000) -> int:
+    """Embed generated batches once and save them as .npz parts for replay without the model."""
+    os.makedirs(directory, exist_ok=True)
+    part, written = 0, 0
+    pending = []
+
+    def save(entries):
+        templates, params = zip(*(extract_template(log_entry["message"]) for log_entry in entries))
+        np.savez(
+            os.path.join(directory, f"part-{part:05d}.npz"),
+            log_family=np.array([log_entry["log_family"] for log_entry in entries]),
+            timestamp=np.array([log_entry["timestamp"] for log_entry in entries], dtype=np.int64),
+            level=np.array([log_entry["level"] for log_entry in entries]),
+            application=np.array([log_entry["application"] for log_entry in entries]),
+            category=np.array([log_entry["category"] for log_entry in entries]),
+            message=np.array([log_entry["message"] for log_entry in entries]),
+            template=np.array(templates),
+            params=np.array([json.dumps(values) for values in params]),
+            embedding=embedder.embed_array(list(templates)),
+        )
+
+    for batch in batches:
+        pending.extend(to_log_entries(batch))
+        while len(pending) >= rows_per_part:
+            save(pending[:rows_per_part])
+            pending, part, written = pending[rows_per_part:], part + 1, written + rows_per_part
+    if pending:
+        save(pending)
+        written += len(pending)
+    return written
+
+def read_dataset(directory: str):
+    """Yield pre-embedded log entries from a dataset written by write_dataset."""
+    for path in sorted(glob.glob(os.path.join(directory, "part-*.npz"))):
+        with np.load(path) as part:
+            columns = {name: part[name] for name in part.files}
+        for i, embedding in enumerate(columns["embedding"]):
+            yield {
+                "log_family": str(columns["log_family"][i]),
+                "timestamp": int(columns["timestamp"][i]),
+                "level": str(columns["level"][i]),
+                "application": str(columns["application"][i]),
+                "category": str(columns["category"][i]),
+                "message": str(columns["message"][i]),
+                "template": str(columns["template"][i]),
+                "params": str(columns["params"][i]),
+                "embedding": embedding.tolist(),
+            }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="High-rate synthetic log load generator.")
+    parser.add_argument("mode", choices=["stdout", "milvus", "dataset", "replay"],
+                        help="stdout: NDJSON lines; milvus: stream into Milvus; dataset: write a pre-embedded dataset; replay: stream a dataset into Milvus")
+    parser.add_argument("--families", nargs="+", default=list(ERRORS), help="Log families to generate")
+    parser.add_argument("--rate", type=float, default=0, help="Target logs/sec (0 = as fast as possible)")
+    parser.add_argument("--profile", choices=sorted(RATE_PROFILES), default="constant", help="Burst profile applied to the rate")
+    parser.add_argument("--period", type=float, default=60.0, help="Burst profile period in seconds")
+    parser.add_argument("--burst", type=float, default=5.0, help="Peak rate multiplier of the burst profile")
+    parser.add_argument("--total", type=int, help="Stop after this many logs")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--start-time", type=int, help="Epoch ms of the first log; makes timestamps reproducible")
+    parser.add_argument("--dir", help="Dataset directory for the dataset and replay modes")
+    parser.add_argument("--unified", action="store_true", help="Write every family into the partitioned unified collection (milvus and replay modes)")
+    parser.add_argument("--bucket", choices=["day", "hour"], default="day", help="Time bucket of unified-collection partitions")
+    add_milvus_arguments(parser)
+    parser.add_argument("--embedding-store", help="Precomputed embedding store consulted before the model (see embeddingStore.py)")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    if "all_logs" in args.families:
+        parser.error("use --unified to write into the unified collection")
+    metrics = MetricsSession(args)
+
+    start = time.time()
+    count = 0
+    store = None
+    if args.embedding_store:
+        from embeddingStore import EmbeddingStore
+        store = EmbeddingStore(args.embedding_store)
+    batches = None if args.mode == "replay" else generate_batches(
+        args.families, args.rate, args.profile, args.period, args.burst, args.total, args.seed, start_ms=args.start_time)
+
+    if args.mode == "stdout":
+        for batch in batches:
+            entries = to_log_entries(batch)
+            sys.stdout.write("".join(json.dumps(log_entry) + "\n" for log_entry in entries))
+            count += len(entries)
+    elif args.mode == "dataset":
+        from embeddingService import EmbeddingService
+        count = write_dataset(args.dir, batches, EmbeddingService(store=store))
+    else:
+        from batchWriter import BatchingLogWriter
+        from unifiedStore import UNIFIED_COLLECTION, make_router
+        import streamerToMilvus
+        connect_from_args(args)
+        streamerToMilvus.create_collections([UNIFIED_COLLECTION] if args.unified else args.families, unified=args.unified)
+        router = make_router(args.bucket) if args.unified else None
+        if args.mode == "milvus":
+            from embeddingService import EmbeddingService
+            writer = BatchingLogWriter(EmbeddingService(store=store).embed, router=router)
+            entries = (log_entry for batch in batches for log_entry in to_log_entries(batch))
+        else:
+            writer = BatchingLogWriter(router=router)  # Rows carry their embeddings; the model is never called
+            entries = read_dataset(args.dir)
+        try:
+            for log_entry in entries:
+                writer.add(UNIFIED_COLLECTION if args.unified else log_entry["log_family"], log_entry)
+                count += 1
+        finally:
+            writer.close()
+    metrics.close()
+
+    elapsed = time.time() - start
+    print(f"Generated {count} logs in {elapsed:.1f} s ({count / max(elapsed, 1e-9):.0f} logs/sec).", file=sys.stderr)
@@ -0,0 +1,86 @@
+import hashlib
+import os
+import socket
+import sys
+import threading
+import time
+
+# Snowflake layout in a positive INT64: 41 bits of milliseconds since ID_EPOCH_MS,
+# 10 bits of worker id and 12 bits of per-millisecond sequence.
+ID_EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+TIME_SHIFT = WORKER_BITS + SEQUENCE_BITS
+WORKER_ENV = "LOG_ID_WORKER"
+
+_warned = False
+
+
+def configured_worker_id(offset: int = 0) -> int:
+    """Worker id $LOG_ID_WORKER plus ``offset`` (e.g. a pipeline stage index); raises if it is unset or out of range."""
+    value = os.environ.get(WORKER_ENV)
+    if not value:
+        raise ValueError(f"Set ${WORKER_ENV} to a worker id no other process writing the same collections uses (0-{MAX_WORKER_ID})")
+    worker_id = int(value) + offset
+    if not 0 <= worker_id <= MAX_WORKER_ID:
+        raise ValueError(f"${WORKER_ENV}={value} plus {offset} is outside 0-{MAX_WORKER_ID}")
+    return worker_id
+
+
+def default_worker_id() -> int:
+    """Worker id from $LOG_ID_WORKER, or derived from the host name and process id.
+
+    The derived id is a 10-bit hash, so two processes can get the same one;
+    set $LOG_ID_WORKER wherever more than one process writes.
+    """
+    global _warned
+    if os.environ.get(WORKER_ENV):
+        return configured_worker_id()
+    if not _warned:
+        _warned = True
+        print(f"${WORKER_ENV} is not set; log ids use a hashed worker id that may collide with another process's", file=sys.stderr)
+    digest = hashlib.blake2b(f"{socket.gethostname()}:{os.getpid()}".encode(), digest_size=2).digest()
+    return int.from_bytes(digest, "big") & MAX_WORKER_ID
+
+
+class SnowflakeIdAllocator:
+    """Allocate unique, time-ordered log ids without coordination between workers.
+
+    Each worker needs its own ``worker_id`` (0-1023); ids from one worker are
+    strictly increasing and ids from all workers sort by allocation time.
+    """
+
+    def __init__(self, worker_id: int = None):
+        self.worker_id = default_worker_id() if worker_id is None else worker_id
+        if not 0 <= self.worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"worker_id must be between 0 and {MAX_WORKER_ID}")
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    def allocate(self, log_entry: dict = None) -> int:
+        """Return the next id."""
+        with self._lock:
+            now = max(int(time.time() * 1000) - ID_EPOCH_MS, self._last_ms)  # Never step back if the clock does
+            if now == self._last_ms:
+                self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+                if self._sequence == 0:  # Sequence exhausted for this millisecond
+                    now += 1
+            else:
+                self._sequence = 0
+            self._last_ms = now
+            return (now << TIME_SHIFT) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+
+
+class ContentHashIdAllocator:
+    """Derive a log id from the entry's content, so re-ingesting the same entry yields the same id."""
+
+    def __init__(self, fields=("log_family", "timestamp", "application", "message")):
+        self.fields = fields
+
+    def allocate(self, log_entry: dict) -> int:
+        key = "\x1f".join(str(log_entry.get(field, "")) for field in self.fields)
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big") >> 1  # Keep it a positive INT64
@@ -0,0 +1,260 @@
+import argparse
+import glob
+import json
+import os
+import re
+import threading
+import time
+from exportCollection import load_checkpoint, save_checkpoint
+from ingestMetrics import METRICS, RateLimitedSummary
+from logIds import SnowflakeIdAllocator
+from milvusClient import add_milvus_arguments, connect_from_args
+
+SEGMENT_REGEX = re.compile(r"segment-(\d{10})\.log$")
+
+
+def segment_path(directory: str, number: int) -> str:
+    return os.path.join(directory, f"segment-{number:010d}.log")
+
+
+def list_segments(directory: str):
+    """Segment numbers present in a spool directory, oldest first."""
+    return sorted(int(match.group(1)) for match in map(SEGMENT_REGEX.search, glob.glob(os.path.join(directory, "segment-*.log"))) if match)
+
+
+class LogSpool:
+    """Append-only, segmented write-ahead spool of log entries on local disk.
+
+    Each record is one JSON line ``{"c": collection, "e": log_entry}``. Writes go
+    straight to the OS, so a crashed process loses nothing, and a background
+    thread fsyncs every ``fsync_interval`` seconds so power loss costs at most
+    that window. Segments roll over at ``segment_bytes``. Entries get their
+    ``log_id`` here, so replaying a record after a crash rewrites the same row.
+    ``add`` has the BatchingLogWriter signature, so the spool can stand in for
+    the writer on the ingest path.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, fsync_interval: float = 0.2, id_allocator=None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.id_allocator = id_allocator or SnowflakeIdAllocator()
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        segments = list_segments(directory)
+        self.segment = segments[-1] if segments else 0
+        self._open(self.segment)
+        self._truncate_torn_tail()
+
+        self._closed = threading.Event()
+        self._syncer = threading.Thread(target=self._sync_periodically, daemon=True)
+        self._syncer.start()
+
+    def _open(self, number: int):
+        self._handle = open(segment_path(self.directory, number), "ab", buffering=0)
+        self.size = self._handle.tell()
+
+    def _truncate_torn_tail(self):
+        """Drop a partial last record left by a crash in the middle of a write."""
+        with open(segment_path(self.directory, self.segment), "rb") as handle:
+            data = handle.read()
+        if data and not data.endswith(b"\n"):
+            self._handle.truncate(data.rfind(b"\n") + 1)
+            self.size = data.rfind(b"\n") + 1
+
+    def add(self, collection_name: str, log_entry: dict):
+        """Append one log entry for a collection."""
+        if "log_id" not in log_entry:
+            log_entry["log_id"] = self.id_allocator.allocate(log_entry)
+        record = (json.dumps({"c": collection_name, "e": log_entry}, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            if self._closed.is_set():
+                raise RuntimeError("LogSpool is closed")
+            self._handle.write(record)
+            self.size += len(record)
+            self._dirty = True
+            if self.size >= self.segment_bytes:
+                self._roll()
+        METRICS.inc("rows_total", stage="spool")
+
+    def _roll(self):
+        """Seal the current segment and start the next one. Caller must hold the lock."""
+        os.fsync(self._handle.fileno())
+        self._handle.close()
+        self.segment += 1
+        self._open(self.segment)
+
+    def sync(self):
+        """fsync everything appended so far."""
+        with self._lock:
+            if not self._dirty:
+                return
+            start = time.perf_counter()
+            os.fsync(self._handle.fileno())
+            self._dirty = False
+        METRICS.observe("stage_seconds", time.perf_counter() - start, stage="spool_fsync")
+
+    def _sync_periodically(self):
+        while not self._closed.wait(self.fsync_interval):
+            self.sync()
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self.sync()
+        self._closed.set()
+        self._syncer.join()
+        with self._lock:
+            self._handle.close()
+
+
+class SpoolDrainer:
+    """Replay a spool into Milvus through a BatchingLogWriter, checkpointing the offset after each batch.
+
+    A batch is checkpointed only once the writer has flushed it, so a restart
+    resumes after the last durable batch; the writer should upsert, which makes
+    re-sending a batch that reached Milvus before a crash harmless. Failures
+    back off exponentially from ``backoff`` up to ``max_backoff`` seconds, and
+    segments are deleted once fully drained.
+    """
+
+    def __init__(self, directory: str, writer, batch_size: int = 5000, poll_interval: float = 0.5,
+                 backoff: float = 0.5, max_backoff: float = 60.0, report_interval: float = 10.0):
+        self.directory = directory
+        self.writer = writer
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.checkpoint_path = os.path.join(directory, "checkpoint.json")
+        checkpoint = load_checkpoint(self.checkpoint_path)
+        segments = list_segments(directory)
+        self.position = (checkpoint.get("segment", segments[0] if segments else 0), checkpoint.get("offset", 0))
+        self._summary = RateLimitedSummary("drain", report_interval)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def read_batch(self):
+        """Return up to batch_size complete records after the checkpoint and the position after them."""
+        segment, offset = self.position
+        records = []
+        while len(records) < self.batch_size:
+            path = segment_path(self.directory, segment)
+            if not os.path.exists(path):
+                break
+            with open(path, "rb") as handle:
+                handle.seek(offset)
+                for line in handle:
+                    if not line.endswith(b"\n"):  # Being written right now
+                        break
+                    record = json.loads(line)
+                    records.append((record["c"], record["e"]))
+                    offset += len(line)
+                    if len(records) >= self.batch_size:
+                        break
+            # Advance once the writer has moved on and nothing was appended to this segment meanwhile
+            if len(records) < self.batch_size and os.path.exists(segment_path(self.directory, segment + 1)) \
+                    and offset == os.path.getsize(path):
+                segment, offset = segment + 1, 0
+            else:
+                break
+        return records, (segment, offset)
+
+    def drain_once(self) -> int:
+        """Write the next batch and checkpoint it; returns the number of records drained."""
+        records, position = self.read_batch()
+        if not records and position == self.position:
+            return 0
+        start = time.perf_counter()
+        for collection_name, log_entry in records:
+            self.writer.add(collection_name, log_entry)
+        self.writer.flush()
+        save_checkpoint(self.checkpoint_path, {"segment": position[0], "offset": position[1]})
+        for number in list_segments(self.directory):
+            if number < position[0]:
+                os.remove(segment_path(self.directory, number))
+        self.position = position
+        if records:
+            METRICS.inc("rows_total", len(records), stage="drain")
+            self._summary.record({"records": len(records)}, time.perf_counter() - start)
+        return len(records)
+
+    def run(self):
+        """Drain until stop() is called, backing off while writes fail."""
+        delay = 0.0
+        while not self._stop.is_set():
+            try:
+                drained = self.drain_once()
+                delay = 0.0
+                if not drained:
+                    self._stop.wait(self.poll_interval)
+            except Exception as error:
+                self.writer.discard()  # The batch is re-read from the checkpoint
+                delay = min(max(delay * 2, self.backoff), self.max_backoff)
+                METRICS.inc("retries_total", stage="drain")
+                print(f"Spool drain failed ({error}); retrying in {delay:.1f} s")
+                self._stop.wait(delay)
+
+    def start(self):
+        """Drain from a background thread."""
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self, drain: bool = True):
+        """Stop draining; with ``drain`` make one last attempt to empty the spool."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if drain:
+            try:
+                while self.drain_once():
+                    pass
+            except Exception as error:
+                self.writer.discard()
+                print(f"Spool left undrained ({error}); it is replayed on the next start")
+        self._summary.flush()
+
+    def backlog_bytes(self) -> int:
+        """Bytes spooled but not drained yet."""
+        segment, offset = self.position
+        return sum(os.path.getsize(segment_path(self.directory, number)) for number in list_segments(self.directory)
+                   if number >= segment) - offset
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drain a log spool into Milvus.")
+    parser.add_argument("directory", help="Spool directory")
+    parser.add_argument("--follow", action="store_true", help="Keep draining new records until interrupted")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Records per Milvus write")
+    parser.add_argument("--bucket", choices=["day", "hour"], help="Route entries into time partitions (unified collection)")
+    parser.add_argument("--embedding-store", help="Precomputed embedding store consulted before the model (see embeddingStore.py)")
+    add_milvus_arguments(parser)
+    args = parser.parse_args()
+
+    from batchWriter import BatchingLogWriter
+    from embeddingService import EmbeddingService
+    from unifiedStore import make_router
+    connect_from_args(args)
+    store = None
+    if args.embedding_store:
+        from embeddingStore import EmbeddingStore
+        store = EmbeddingStore(args.embedding_store)
+    writer = BatchingLogWriter(EmbeddingService(store=store).embed, max_rows=args.batch_size, max_latency=3600.0,
+                               router=make_router(args.bucket) if args.bucket else None, upsert=True, retries=1)
+    drainer = SpoolDrainer(args.directory, writer, args.batch_size)
+    print(f"Draining '{args.directory}' from segment {drainer.position[0]} offset {drainer.position[1]} "
+          f"({drainer.backlog_bytes()} bytes pending)")
+    try:
+        if args.follow:
+            drainer.run()
+        else:
+            while drainer.drain_once():
+                pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        drainer.stop(drain=False)
+        writer.close()
+    print(f"Stopped at segment {drainer.position[0]} offset {drainer.position[1]} ({drainer.backlog_bytes()} bytes pending)")
@@ -0,0 +1,28 @@
+import re
+
+# Volatile tokens masked out of log messages, tried in this order at each position
+TOKEN_PATTERNS = [
+    ("UUID", r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"),
+    ("IP", r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"),
+    ("HEX", r"\b0[xX][0-9a-fA-F]+\b|\b[0-9a-fA-F]{16,}\b"),
+    ("STR", r"'[^']*'|\"[^\"]*\""),
+    ("NUM", r"(?<![\w.])\d+(?:\.\d+)?(?:ms|s)?\b"),
+]
+
+TOKEN_REGEX = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in TOKEN_PATTERNS))
+
+
+def extract_template(message: str):
+    """Split a log message into its template and the volatile parameters masked out of it.
+
+    >>> extract_template("Pod 'frontend-123' has crashed 5 times [0b0e4c1e-7d6a-4f8e-9a51-3c2d1e0f9b7a]")
+    ('Pod <STR> has crashed <NUM> times [<UUID>]', ["'frontend-123'", '5', '0b0e4c1e-7d6a-4f8e-9a51-3c2d1e0f9b7a'])
+    """
+    params = []
+
+    def mask(match):
+        params.append(match.group())
+        return f"<{match.lastgroup}>"
+
+    template = TOKEN_REGEX.sub(mask, message)
+    return template, params
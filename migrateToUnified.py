@@ -0,0 +1,101 @@
+import argparse
+import time
+import numpy as np
+from pymilvus import Collection, utility
+from batchWriter import BatchingLogWriter
+from embeddingService import EmbeddingService
+from logIds import ContentHashIdAllocator
+from logTemplater import extract_template
+from milvusClient import add_milvus_arguments, connect_from_args
+from unifiedStore import UNIFIED_COLLECTION, make_router
+from vectorCodec import VECTOR_TYPES, vector_type_of
+import streamerToMilvus
+
+def decode_embedding(value, vector_type: str):
+    """Return a stored embedding as float32 values, or None when it cannot be recovered (binary)."""
+    if vector_type == "float32":
+        return list(value)
+    if vector_type == "float16":
+        if isinstance(value, list):  # Some clients return the raw bytes wrapped in a list
+            value = b"".join(value) if value and isinstance(value[0], bytes) else np.asarray(value, dtype=np.float16).tobytes()
+        return np.frombuffer(value, dtype=np.float16).astype(np.float32).tolist()
+    return None
+
+def row_to_log_entry(row: dict, log_family: str, vector_type: str = "float32") -> dict:
+    """Convert a row read from a per-type collection back into a log entry.
+
+    Sign bits cannot be turned back into an embedding, so rows of binary
+    collections are left without one and the writer re-embeds their template.
+    """
+    log_entry = {
+        "source_log_id": row["log_id"],  # Per-type ids may collide across collections; a new id is derived from this
+        "timestamp": row["timestamp"],
+        "application": row["service"],
+        "level": row["log_level"],
+        "host": row["host"],
+        "namespace": row["namespace"],
+        "pod_name": row["pod_name"],
+        "trace_id": row["trace_id"],
+        "message": row["raw_log"],
+        "log_family": log_family,
+    }
+    embedding = decode_embedding(row["embedding"], vector_type) if "embedding" in row else None
+    if embedding is not None:
+        log_entry["embedding"] = embedding
+    if "template" in row:
+        log_entry["template"], log_entry["params"] = row["template"], row["params"]
+    else:  # Collections created before templating was added
+        log_entry["template"], log_entry["params"] = extract_template(row["raw_log"])
+    for field in ("count", "first_seen", "last_seen"):  # Absent in collections created before burst aggregation
+        if field in row:
+            log_entry[field] = row[field]
+    return log_entry
+
+def migrate_collection(collection_name: str, writer: BatchingLogWriter, batch_size: int) -> int:
+    """Copy every row of a per-type collection into the unified collection."""
+    collection = Collection(collection_name)
+    collection.load()
+    vector_type = next(vector_type_of(field.dtype) for field in collection.schema.fields if field.name == "embedding")
+    output_fields = [field.name for field in collection.schema.fields if field.name != "embedding" or vector_type != "binary"]
+    iterator = collection.query_iterator(batch_size=batch_size, expr="", output_fields=output_fields)
+    copied = 0
+    try:
+        while True:
+            rows = iterator.next()
+            if not rows:
+                break
+            for row in rows:
+                writer.add(UNIFIED_COLLECTION, row_to_log_entry(row, collection_name, vector_type))
+            copied += len(rows)
+    finally:
+        iterator.close()
+    print(f"Copied {copied} rows from '{collection_name}'.")
+    return copied
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=f"Copy the per-type log collections into '{UNIFIED_COLLECTION}'.")
+    parser.add_argument("collections", nargs="*", help="Collections to migrate (default: all per-type collections)")
+    parser.add_argument("--bucket", choices=["day", "hour"], default="day", help="Time bucket of unified-collection partitions")
+    parser.add_argument("--vector-type", choices=sorted(VECTOR_TYPES), default="float32", help=f"Embedding storage type if '{UNIFIED_COLLECTION}' is created")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows read per query page and written per insert")
+    add_milvus_arguments(parser)
+    args = parser.parse_args()
+
+    connect_from_args(args)
+    streamerToMilvus.create_collections([UNIFIED_COLLECTION], unified=True, vector_type=args.vector_type)
+
+    start = time.time()
+    total = 0
+    # Content-hash ids plus upserts make re-running an interrupted migration idempotent;
+    # the model is only loaded if a binary collection has to be re-embedded
+    writer = BatchingLogWriter(EmbeddingService().embed, max_rows=args.batch_size, max_latency=30.0, router=make_router(args.bucket),
+                               id_allocator=ContentHashIdAllocator(("log_family", "source_log_id", "timestamp", "message")), upsert=True)
+    try:
+        for collection_name in args.collections or streamerToMilvus.COLLECTIONS:
+            if collection_name in utility.list_collections():
+                total += migrate_collection(collection_name, writer, args.batch_size)
+            else:
+                print(f"Collection '{collection_name}' does not exist; skipping.")
+    finally:
+        writer.close()
+    print(f"Migrated {total} rows into '{UNIFIED_COLLECTION}' in {time.time() - start:.1f} s.")
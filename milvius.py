@@ -1,8 +1,5 @@
-from pymilvus import connections, Collection, FieldSchema, CollectionSchema, DataType
-
-def connect_to_milvus(host: str, port: str):
-    connections.connect(alias="default", host=host, port=port)
-    print(f"Connected to Milvus at {host}:{port}")
+from pymilvus import Collection, FieldSchema, CollectionSchema, DataType
+from milvusClient import connect_to_milvus
 
 def create_collection(collection_name: str):
     fields = [
@@ -18,11 +15,9 @@ def check_collection_exists(collection_name: str):
 
 if __name__ == "__main__":
     print("Hello")
-    MILVUS_HOST = "192.168.2.220"
-    MILVUS_PORT = "19530"
     COLLECTION_NAME = "test_collection"
 
-    connect_to_milvus(MILVUS_HOST, MILVUS_PORT)
+    connect_to_milvus()  # $MILVUS_HOST/$MILVUS_PORT, $MILVUS_ENDPOINTS or $MILVUS_CONFIG
     
     if COLLECTION_NAME not in Collection.list_collections():
         create_collection(COLLECTION_NAME)
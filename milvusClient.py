@@ -0,0 +1,280 @@
+import itertools
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pymilvus import Collection, connections, utility
+
+# Used when neither the command line, the environment nor a config file names a server
+DEFAULT_HOST = "192.168.2.220"
+DEFAULT_PORT = "19530"
+
+CONFIG_ENV = "MILVUS_CONFIG"        # JSON file: {"endpoints": ["host:port[/role]", ...], "pool_size": 4}
+ENDPOINTS_ENV = "MILVUS_ENDPOINTS"  # Comma-separated host:port[/role] list
+HOST_ENV = "MILVUS_HOST"
+PORT_ENV = "MILVUS_PORT"
+ROLES = ("both", "read", "write")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class Endpoint:
+    """A Milvus server address and whether it takes reads, writes or both."""
+
+    def __init__(self, host: str, port: str = DEFAULT_PORT, role: str = "both"):
+        if role not in ROLES:
+            raise ValueError(f"Unknown endpoint role '{role}' (expected one of {', '.join(ROLES)})")
+        self.host = host
+        self.port = str(port)
+        self.role = role
+
+    @property
+    def name(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    def serves(self, mode: str) -> bool:
+        return self.role in ("both", mode)
+
+
+def parse_endpoint(spec: str) -> Endpoint:
+    """Parse 'host[:port][/read|/write|/both]'."""
+    address, _, role = spec.partition("/")
+    host, _, port = address.partition(":")
+    return Endpoint(host, port or DEFAULT_PORT, role or "both")
+
+
+def read_config() -> dict:
+    """Return the JSON config named by $MILVUS_CONFIG, or an empty one."""
+    path = os.environ.get(CONFIG_ENV)
+    if not path:
+        return {}
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def resolve_endpoints(specs=None, host: str = None, port: str = None):
+    """Pick the endpoint specs to use: explicit specs, then host/port, then the environment, then the config file."""
+    if specs:
+        return list(specs)
+    if host or port:
+        return [f"{host or os.environ.get(HOST_ENV, DEFAULT_HOST)}:{port or os.environ.get(PORT_ENV, DEFAULT_PORT)}"]
+    if os.environ.get(ENDPOINTS_ENV):
+        return [spec.strip() for spec in os.environ[ENDPOINTS_ENV].split(",") if spec.strip()]
+    if os.environ.get(HOST_ENV) or os.environ.get(PORT_ENV):
+        return [f"{os.environ.get(HOST_ENV, DEFAULT_HOST)}:{os.environ.get(PORT_ENV, DEFAULT_PORT)}"]
+    return read_config().get("endpoints") or [f"{DEFAULT_HOST}:{DEFAULT_PORT}"]
+
+
+class MilvusPool:
+    """Several connections to one or more Milvus endpoints, shared by every thread of a process.
+
+    Each endpoint gets ``pool_size`` connection aliases (one gRPC channel each).
+    Writes go to the first healthy endpoint that takes writes; reads are spread
+    round-robin over the healthy read endpoints, falling back to the writable
+    ones. Endpoints are expected to serve the same data, e.g. proxies of one
+    cluster or a primary and its replicas. A background thread pings every
+    endpoint each ``health_interval`` seconds and routing skips the ones that
+    do not answer. The ``default`` alias points at the primary write endpoint
+    so admin code building ``Collection(name)`` directly keeps working.
+
+    Collection handles and the partitions known to be loaded are cached per
+    alias and endpoint; ``executor`` runs inserts and searches concurrently.
+
+    With no endpoints the pool wraps an existing ``default`` connection.
+    """
+
+    def __init__(self, endpoints=None, pool_size: int = 4, health_interval: float = 10.0, timeout: float = 10.0):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.health_interval = health_interval
+        self.endpoints = [parse_endpoint(endpoint) if isinstance(endpoint, str) else endpoint for endpoint in endpoints or []]
+        if self.endpoints:
+            self._aliases = {endpoint.name: [f"milvus-{number}-{slot}" for slot in range(pool_size)]
+                             for number, endpoint in enumerate(self.endpoints)}
+        else:
+            self.endpoints = [Endpoint("default", DEFAULT_PORT)]
+            self._aliases = {self.endpoints[0].name: ["default"]}
+        self._healthy = {endpoint.name: True for endpoint in self.endpoints}
+        self._handles = {}  # (alias, collection name) -> Collection
+        self._loaded = {}   # (endpoint name, collection name) -> loaded partition names, or None for the whole collection
+        self._counter = itertools.count()  # Rotates reads over endpoints
+        self._alias_counters = {endpoint.name: itertools.count() for endpoint in self.endpoints}  # Rotates over an endpoint's connections
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=pool_size * len(self.endpoints))
+
+        if endpoints:
+            for endpoint in self.endpoints:
+                self._healthy[endpoint.name] = self._connect(endpoint)
+            if not any(self._healthy.values()):
+                raise ConnectionError(f"No Milvus endpoint answered: {', '.join(endpoint.name for endpoint in self.endpoints)}")
+            primary = self._pick("write") if any(self._healthy[endpoint.name] and endpoint.serves("write") for endpoint in self.endpoints) \
+                else self._pick("read")  # Read-only tools still work while every writable endpoint is down
+            if connections.has_connection("default"):
+                connections.disconnect("default")
+            connections.connect(alias="default", host=primary.host, port=primary.port, timeout=timeout)
+
+        self._closed = threading.Event()
+        self._health_thread = None
+        if endpoints and health_interval:
+            self._health_thread = threading.Thread(target=self._watch_health, daemon=True)
+            self._health_thread.start()
+
+    def _connect(self, endpoint: Endpoint) -> bool:
+        try:
+            for alias in self._aliases[endpoint.name]:
+                if not connections.has_connection(alias):
+                    connections.connect(alias=alias, host=endpoint.host, port=endpoint.port, timeout=self.timeout)
+            print(f"Connected to Milvus at {endpoint.name} ({endpoint.role}, {self.pool_size} connections)")
+            return True
+        except Exception as error:
+            print(f"Milvus endpoint {endpoint.name} is unavailable ({error})")
+            return False
+
+    def check_health(self, endpoint: Endpoint) -> bool:
+        """Ping an endpoint, reconnecting it if it has never been reachable, and record the result."""
+        alias = self._aliases[endpoint.name][0]
+        try:
+            if not connections.has_connection(alias) and not self._connect(endpoint):
+                raise ConnectionError("not connected")
+            utility.get_server_version(using=alias, timeout=self.timeout)
+            healthy = True
+        except Exception:
+            healthy = False
+        with self._lock:
+            if healthy != self._healthy[endpoint.name]:
+                print(f"Milvus endpoint {endpoint.name} is {'back' if healthy else 'down'}")
+                self._loaded = {key: value for key, value in self._loaded.items() if key[0] != endpoint.name}
+            self._healthy[endpoint.name] = healthy
+        return healthy
+
+    def _watch_health(self):
+        while not self._closed.wait(self.health_interval):
+            for endpoint in self.endpoints:
+                self.check_health(endpoint)
+
+    def _pick(self, mode: str, exclude=()) -> Endpoint:
+        """Choose the endpoint for a read or a write."""
+        candidates = [endpoint for endpoint in self.endpoints if self._healthy[endpoint.name] and endpoint.name not in exclude]
+        if mode == "write":
+            writable = [endpoint for endpoint in candidates if endpoint.serves("write")]
+            if not writable:
+                raise ConnectionError("No healthy Milvus endpoint takes writes")
+            return writable[0]
+        readers = [endpoint for endpoint in candidates if endpoint.role == "read"] or \
+                  [endpoint for endpoint in candidates if endpoint.serves("read")]
+        if not readers:
+            raise ConnectionError("No healthy Milvus endpoint takes reads")
+        return readers[next(self._counter) % len(readers)]
+
+    def alias(self, mode: str = "read", exclude=()) -> str:
+        """Return a connection alias for a read or write, rotating over the endpoint's connections."""
+        endpoint = self._pick(mode, exclude)
+        aliases = self._aliases[endpoint.name]
+        return aliases[next(self._alias_counters[endpoint.name]) % len(aliases)]
+
+    def endpoint_of(self, alias: str) -> str:
+        return next(name for name, aliases in self._aliases.items() if alias in aliases)
+
+    def collection(self, collection_name: str, mode: str = "read", alias: str = None) -> Collection:
+        """Return a cached Collection handle bound to a pooled connection."""
+        alias = alias or self.alias(mode)
+        key = (alias, collection_name)
+        handle = self._handles.get(key)
+        if handle is None:
+            handle = self._handles[key] = Collection(collection_name, using=alias)
+        return handle
+
+    def ensure_loaded(self, collection_name: str, partition_names=None, alias: str = None):
+        """Load a collection (or some of its partitions) unless this process already did."""
+        alias = alias or self.alias("read")
+        key = (self.endpoint_of(alias), collection_name)
+        with self._lock:
+            loaded = self._loaded.get(key, ())
+        if loaded is None or (partition_names and set(partition_names) <= set(loaded)):
+            return
+        self.collection(collection_name, alias=alias).load(partition_names=partition_names)
+        with self._lock:
+            self._loaded[key] = set(loaded) | set(partition_names) if partition_names else None
+
+    def forget_loaded(self, collection_name: str):
+        """Drop cached load state, e.g. after partitions were released elsewhere."""
+        with self._lock:
+            self._loaded = {key: value for key, value in self._loaded.items() if key[1] != collection_name}
+
+    def call(self, mode: str, operation, collection_name: str = None):
+        """Run ``operation(alias)`` on a pooled connection.
+
+        A failed read is retried once on another endpoint (or connection) after
+        the failing endpoint is re-checked and the collection's cached load
+        state is dropped; writes are retried by their callers.
+        """
+        alias = self.alias(mode)
+        try:
+            return operation(alias)
+        except Exception:
+            if mode != "read":
+                raise
+            endpoint = self.endpoint_of(alias)
+            if collection_name:
+                self.forget_loaded(collection_name)
+            healthy = self.check_health(next(item for item in self.endpoints if item.name == endpoint))
+            return operation(self.alias(mode, exclude=() if healthy else (endpoint,)))
+
+    def submit(self, mode: str, operation, collection_name: str = None):
+        """Run ``call(mode, operation)`` on the pool's executor and return the future."""
+        return self.executor.submit(self.call, mode, operation, collection_name)
+
+    def close(self):
+        self._closed.set()
+        if self._health_thread is not None:
+            self._health_thread.join()
+        self.executor.shutdown(wait=True)
+        for aliases in self._aliases.values():
+            for alias in aliases:
+                if alias != "default" and connections.has_connection(alias):
+                    connections.disconnect(alias)
+
+
+def connect(endpoints=None, pool_size: int = None, health_interval: float = None) -> MilvusPool:
+    """Open the process-wide pool (endpoint specs default to resolve_endpoints())."""
+    global _pool
+    config = read_config()
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()  # The new pool reuses its connection aliases
+        _pool = MilvusPool(endpoints or resolve_endpoints(), pool_size or config.get("pool_size", 4),
+                           health_interval if health_interval is not None else config.get("health_interval", 10.0))
+        return _pool
+
+
+def get_pool() -> MilvusPool:
+    """Return the process-wide pool, wrapping the plain ``default`` connection if connect() was never called."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = MilvusPool()
+        return _pool
+
+
+def connect_to_milvus(host: str = None, port: str = None) -> MilvusPool:
+    """Connect to Milvus (kept for the scripts' original call sites)."""
+    return connect(resolve_endpoints(host=host, port=port))
+
+
+def add_milvus_arguments(parser):
+    """Add the shared Milvus connection options to a CLI."""
+    parser.add_argument("--host", help=f"Milvus host (default: ${HOST_ENV}, ${CONFIG_ENV} or {DEFAULT_HOST})")
+    parser.add_argument("--port", help=f"Milvus port (default: ${PORT_ENV} or {DEFAULT_PORT})")
+    parser.add_argument("--milvus", action="append", metavar="HOST:PORT[/ROLE]",
+                        help=f"Milvus endpoint, repeatable; ROLE is read, write or both (default: ${ENDPOINTS_ENV})")
+    parser.add_argument("--pool-size", type=int, help="Connections per Milvus endpoint (default: 4)")
+
+
+def endpoints_from_args(args):
+    return resolve_endpoints(args.milvus, args.host, args.port)
+
+
+def connect_from_args(args) -> MilvusPool:
+    """Open the pool for the endpoints chosen on the command line."""
+    return connect(endpoints_from_args(args), args.pool_size)
@@ -0,0 +1,199 @@
+import argparse
+import os
+import time
+from pymilvus import Collection, DataType, utility
+from exportCollection import export_collection, load_checkpoint, save_checkpoint
+from milvusClient import add_milvus_arguments, connect_from_args
+from searchLogs import DURATION_REGEX, DURATION_SECONDS
+from unifiedStore import BUCKET_MILLIS, UNIFIED_COLLECTION, bucket_range, partition_for
+import streamerToMilvus
+
+# Milvus' default rootCoord.maxPartitionNum (partitions per collection)
+MAX_PARTITIONS = 1024
+
+
+def parse_duration(value: str) -> int:
+    """Parse a duration such as '36h' or '30d' into milliseconds."""
+    match = DURATION_REGEX.match(value)
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid duration '{value}' (expected e.g. 90m, 36h or 30d)")
+    return int(float(match.group(1)) * DURATION_SECONDS[match.group(2)] * 1000)
+
+
+def classify_partitions(partition_names, now_ms: int, hot_ms: int, ttl_ms: int):
+    """Split time-bucket partitions into hot (loaded), warm (released) and expired (dropped) ones.
+
+    A partition is hot while any of its bucket lies within ``hot_ms`` of now and
+    expires once all of it is older than ``ttl_ms``. Partitions that are not time
+    buckets (such as _default) are left alone.
+    """
+    hot, warm, expired = [], [], []
+    for partition_name in partition_names:
+        bucket = bucket_range(partition_name)
+        if bucket is None:
+            continue
+        last_ms = bucket[2]
+        if last_ms >= now_ms - hot_ms:
+            hot.append(partition_name)
+        elif last_ms < now_ms - ttl_ms:
+            expired.append(partition_name)
+        else:
+            warm.append(partition_name)
+    return hot, warm, expired
+
+
+def families_for(collection_name: str):
+    """Return the log families whose partitions a collection holds: all of them in the unified collection, else its own."""
+    if collection_name == UNIFIED_COLLECTION:
+        return list(streamerToMilvus.COLLECTIONS.values())
+    family = streamerToMilvus.COLLECTIONS.get(collection_name)
+    return [family] if family else []
+
+
+class RetentionManager:
+    """Apply a hot-window/TTL lifecycle to a log collection.
+
+    On the partitioned unified collection each run creates the current and next
+    ``ahead`` buckets for every family, loads the partitions of the last
+    ``hot_ms``, releases older ones and, past ``ttl_ms``, archives (when
+    ``archive_dir`` is set) and drops them. Dropping a partition frees its
+    segments outright. Per-type collections have no time partitions, so expired
+    rows are archived, deleted and the collection compacted to reclaim them.
+
+    Archives are Parquet parts plus a row-aligned ``.npy`` of the float32
+    embeddings, written by exportCollection with resume enabled, so a run
+    interrupted between archiving and dropping picks up where it stopped.
+    """
+
+    def __init__(self, collection_name: str, hot_ms: int, ttl_ms: int, bucket: str = "day", archive_dir: str = None,
+                 families=None, ahead: int = 1, dry_run: bool = False, max_partitions: int = MAX_PARTITIONS):
+        if ttl_ms < hot_ms:
+            raise ValueError("The TTL must be at least as long as the hot window")
+        needed = len(set(families or [])) * (-(-ttl_ms // BUCKET_MILLIS[bucket]) + 1 + ahead)
+        if needed > max_partitions:
+            raise ValueError(f"Keeping {len(set(families or []))} families for {ttl_ms // 3600000} h in {bucket} buckets needs "
+                             f"{needed} partitions, over the limit of {max_partitions}; use day buckets or a shorter TTL")
+        self.collection_name = collection_name
+        self.hot_ms = hot_ms
+        self.ttl_ms = ttl_ms
+        self.bucket = bucket
+        self.archive_dir = archive_dir
+        self.families = set(families or [])
+        self.ahead = ahead
+        self.dry_run = dry_run
+
+    def _act(self, description: str, action, *args):
+        print(f"{'[dry run] ' if self.dry_run else ''}{description}")
+        if not self.dry_run:
+            return action(*args)
+
+    def _archive(self, collection: Collection, name: str, expr: str = "", partition_names=None):
+        """Export rows to <archive_dir>/<collection>/<name>-NNNNN.parquet and <name>.parquet.npy."""
+        directory = os.path.join(self.archive_dir, self.collection_name)
+        os.makedirs(directory, exist_ok=True)
+        vectors = any(field.dtype == DataType.FLOAT_VECTOR for field in collection.schema.fields)  # Compact vectors are re-embedded from templates
+        return export_collection(self.collection_name, os.path.join(directory, f"{name}.parquet"), "parquet", vectors=vectors,
+                                 expr=expr, resume=True, partition_names=partition_names)
+
+    def ensure_partitions(self, collection: Collection, partition_names, now_ms: int):
+        """Create the current and upcoming buckets so writers never race to create them."""
+        families = self.families | {bucket_range(name)[0] for name in partition_names if bucket_range(name)}
+        created = []
+        for family in sorted(families):
+            for step in range(self.ahead + 1):
+                name = partition_for(family, now_ms + step * BUCKET_MILLIS[self.bucket], self.bucket)
+                if name not in partition_names and not self.dry_run:
+                    collection.create_partition(name)
+                    created.append(name)
+        return created
+
+    def run(self, now_ms: int = None) -> dict:
+        """Apply the policy once and return what was done."""
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        collection = Collection(self.collection_name)
+        partition_names = [partition.name for partition in collection.partitions]
+        if not any(bucket_range(name) for name in partition_names) and self.collection_name != UNIFIED_COLLECTION:
+            return self._run_unpartitioned(collection, now_ms)
+
+        created = self.ensure_partitions(collection, partition_names, now_ms)
+        hot, warm, expired = classify_partitions(partition_names + created, now_ms, self.hot_ms, self.ttl_ms)
+        if hot:
+            self._act(f"Loading {len(hot)} hot partitions of '{self.collection_name}'", collection.load, hot)
+        for name in warm:
+            self._act(f"Releasing '{name}'", collection.partition(name).release)
+        archived = 0
+        for name in expired:
+            if self.archive_dir:  # Exporting loads the partition, so archive before releasing it
+                archived += self._act(f"Archiving '{name}' to {self.archive_dir}", self._archive, collection, name, "", [name]) or 0
+            self._act(f"Releasing '{name}'", collection.partition(name).release)
+            self._act(f"Dropping '{name}'", self._drop, collection, name)
+        return {"created": len(created), "hot": len(hot), "released": len(warm), "dropped": len(expired), "archived_rows": archived}
+
+    def _run_unpartitioned(self, collection: Collection, now_ms: int) -> dict:
+        """Archive, delete and compact the rows of a collection without time partitions that are past the TTL.
+
+        The cutoff of an archive is kept in ``pending.json`` until its rows are
+        deleted, so a run interrupted in between resumes the same archive rather
+        than exporting the rows again under a new name.
+        """
+        cutoff = now_ms - self.ttl_ms
+        pending_path = None
+        if self.archive_dir:
+            pending_path = os.path.join(self.archive_dir, self.collection_name, "pending.json")
+            cutoff = load_checkpoint(pending_path).get("cutoff", cutoff)
+        expr = f"timestamp < {cutoff}"
+        archived = 0
+        if self.archive_dir:
+            if not self.dry_run:
+                os.makedirs(os.path.dirname(pending_path), exist_ok=True)
+                save_checkpoint(pending_path, {"cutoff": cutoff})
+            archived = self._act(f"Archiving rows of '{self.collection_name}' older than {cutoff}", self._archive,
+                                 collection, f"before-{cutoff}", expr) or 0
+        else:
+            collection.load()
+        result = self._act(f"Deleting rows of '{self.collection_name}' older than {cutoff}", collection.delete, expr)
+        if pending_path and not self.dry_run:
+            os.remove(pending_path)  # The next run archives from a new cutoff
+        deleted = getattr(result, "delete_count", 0) if result is not None else 0
+        if deleted:
+            self._act(f"Compacting '{self.collection_name}' to reclaim {deleted} deleted rows", self._compact, collection)
+        return {"deleted": deleted, "archived_rows": archived}
+
+    def _drop(self, collection: Collection, name: str):
+        """Drop a partition, which Milvus only allows once it is released."""
+        if utility.load_state(self.collection_name, partition_names=[name]).name != "NotLoad":
+            raise RuntimeError(f"Partition '{name}' of '{self.collection_name}' is still loaded; not dropping it")
+        collection.drop_partition(name)
+
+    @staticmethod
+    def _compact(collection: Collection):
+        collection.compact()
+        collection.wait_for_compaction_completed()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep the hot window of a log collection loaded and expire old logs.")
+    parser.add_argument("--collections", nargs="+", default=[UNIFIED_COLLECTION], help="Collections to manage")
+    parser.add_argument("--hot", type=parse_duration, default=parse_duration("1d"), help="Window kept loaded for search, e.g. 36h")
+    parser.add_argument("--ttl", type=parse_duration, default=parse_duration("30d"), help="Age after which logs are dropped, e.g. 30d")
+    parser.add_argument("--bucket", choices=["day", "hour"], default="day", help="Time bucket of new partitions (match the writer's)")
+    parser.add_argument("--ahead", type=int, default=1, help="Upcoming buckets to create in advance")
+    parser.add_argument("--archive", help="Archive expired logs here as Parquet plus .npy before dropping them")
+    parser.add_argument("--interval", type=parse_duration, help="Run again every interval (e.g. 15m) instead of once")
+    parser.add_argument("--dry-run", action="store_true", help="Print what would be done without changing anything")
+    parser.add_argument("--max-partitions", type=int, default=MAX_PARTITIONS, help="Partition limit of the Milvus deployment")
+    add_milvus_arguments(parser)
+    args = parser.parse_args()
+
+    try:  # Fail before connecting when the bucket/TTL combination cannot fit
+        managers = [RetentionManager(name, args.hot, args.ttl, args.bucket, args.archive, families_for(name),
+                                     args.ahead, args.dry_run, args.max_partitions) for name in args.collections]
+    except ValueError as error:
+        parser.error(str(error))
+    connect_from_args(args)
+    while True:
+        for manager in managers:
+            print(f"'{manager.collection_name}': {manager.run()}")
+        if not args.interval:
+            break
+        time.sleep(args.interval / 1000)
@@ -0,0 +1,211 @@
+import argparse
+import heapq
+import re
+import time
+from datetime import datetime, timezone
+import numpy as np
+from pymilvus import utility
+from embeddingService import EmbeddingService
+from logTemplater import extract_template
+from milvusClient import add_milvus_arguments, connect_from_args, get_pool
+from unifiedStore import UNIFIED_COLLECTION, load_for_search, partitions_for_expr, searchable_partitions
+from vectorCodec import encode_vectors, vector_type_of
+import streamerToMilvus
+
+# Fields returned with each hit; the embedding itself is never sent back
+RESULT_FIELDS = ["log_id", "timestamp", "service", "log_level", "host", "namespace", "pod_name", "trace_id", "raw_log", "count", "first_seen", "last_seen"]
+
+# Metrics where a larger score means a closer match
+SIMILARITY_METRICS = {"IP", "COSINE"}
+
+# Candidates fetched per result when compact (float16/binary) collections are re-ranked
+RERANK_FACTOR = 4
+
+DURATION_REGEX = re.compile(r"^(\d+(?:\.\d+)?)([smhd])$")
+DURATION_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+_query_embedder = None
+_collections = {}  # collection name -> (field names, metric type, index type, vector type)
+
+def parse_time(value: str) -> int:
+    """Parse a relative duration ('15m', '24h', '7d'), epoch milliseconds or ISO-8601 time into epoch milliseconds."""
+    match = DURATION_REGEX.match(value)
+    if match:
+        return int((time.time() - float(match.group(1)) * DURATION_SECONDS[match.group(2)]) * 1000)
+    if value.isdigit():
+        return int(value)
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+def quote(value: str) -> str:
+    """Quote a string literal for a Milvus expression."""
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+def build_expr(service=None, level=None, log_family=None, since: int = None, until: int = None, min_count: int = None) -> str:
+    """Compile search filters into a Milvus boolean expression."""
+    clauses = []
+    for field, value in (("service", service), ("log_level", level), ("log_family", log_family)):
+        if isinstance(value, (list, tuple)):
+            clauses.append(f"{field} in [{', '.join(quote(item) for item in value)}]")
+        elif value:
+            clauses.append(f"{field} == {quote(value)}")
+    if since is not None:
+        clauses.append(f"timestamp >= {since}")
+    if until is not None:
+        clauses.append(f"timestamp <= {until}")
+    if min_count is not None and min_count > 1:
+        clauses.append(f"count >= {min_count}")
+    return " && ".join(clauses)
+
+def query_embedder() -> EmbeddingService:
+    """Return the embedder shared by queries and re-ranking."""
+    global _query_embedder
+    if _query_embedder is None:
+        _query_embedder = EmbeddingService(cache_size=10000)
+    return _query_embedder
+
+def embed_query(text: str):
+    """Embed query text the way log lines are embedded, reusing cached query vectors."""
+    template, _ = extract_template(text)
+    return query_embedder().embed([template])[0]
+
+def _collection(collection_name: str):
+    """Return a collection's field names, index metric and type and embedding storage type (cached)."""
+    cached = _collections.get(collection_name)
+    if cached is None:
+        collection = get_pool().collection(collection_name, "read")
+        index = collection.indexes[0].params if collection.indexes else {}
+        fields = [field.name for field in collection.schema.fields]
+        vector_type = next(vector_type_of(field.dtype) for field in collection.schema.fields if field.name == "embedding")
+        cached = _collections[collection_name] = (fields, index.get("metric_type", "L2"), index.get("index_type", "IVF_FLAT"), vector_type)
+    return cached
+
+def search_params(index_type: str, limit: int, nprobe: int, ef: int) -> dict:
+    """Return the search-time parameters that apply to an index type."""
+    if index_type.startswith("HNSW"):
+        return {"ef": max(ef, limit)}
+    if index_type.startswith(("IVF", "BIN_IVF")):
+        return {"nprobe": nprobe}
+    if index_type == "DISKANN":
+        return {"search_list": max(ef, limit)}
+    return {}
+
+def search_collection(collection_name: str, query_vector, expr: str, limit: int, nprobe: int, ef: int):
+    """Search one collection and return its hits as dictionaries."""
+    fields, metric_type, index_type, vector_type = _collection(collection_name)
+    params = search_params(index_type, limit, nprobe, ef)
+    if "log_family" in expr and "log_family" not in fields:
+        return []  # Per-type collections have no log_family field; a family filter cannot match them
+    if "count >=" in expr and "count" not in fields:
+        return []  # Collections created before burst aggregation hold one line per row
+    output_fields = [field for field in RESULT_FIELDS + ["log_family", "template"] if field in fields]
+
+    def run(alias: str):
+        collection = get_pool().collection(collection_name, alias=alias)
+        partition_names = None
+        if collection_name == UNIFIED_COLLECTION:
+            partition_names = partitions_for_expr(searchable_partitions(collection), expr, streamerToMilvus.SERVICE_FAMILIES)
+            if partition_names == []:
+                return [[]]
+        load_for_search(collection_name, partition_names, alias)
+        return collection.search(
+            data=encode_vectors([query_vector], vector_type),
+            anns_field="embedding",
+            param={"metric_type": metric_type, "params": params},
+            limit=limit,
+            expr=expr or None,
+            partition_names=partition_names,
+            output_fields=output_fields,
+        )
+
+    results = get_pool().call("read", run, collection_name)  # Retried on another endpoint if this one fails
+    hits = []
+    for hit in results[0]:
+        row = {field: hit.entity.get(field) for field in output_fields}
+        row.update(collection=collection_name, distance=hit.distance, metric_type=metric_type)
+        hits.append(row)
+    return hits
+
+def rerank_hits(query_vector, hits):
+    """Rescore hits by exact cosine similarity between the query and their full-precision embeddings.
+
+    Rows are embedded from their template, so the full-precision vectors come from
+    the query embedder: its embedding store when one is configured, else the model.
+    """
+    templates = [hit.get("template") or extract_template(hit["raw_log"])[0] for hit in hits]
+    vectors = query_embedder().embed_array(templates)
+    query = np.asarray(query_vector, dtype=np.float32)
+    similarity = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query) + 1e-12)
+    for hit, score in zip(hits, similarity.tolist()):
+        hit.update(approx_distance=hit["distance"], distance=score, metric_type="COSINE")
+    return hits
+
+def search_logs(text: str, collection_names, service=None, level=None, log_family=None, since: int = None,
+                until: int = None, limit: int = 10, nprobe: int = 16, ef: int = 64, rerank: int = None,
+                min_count: int = None):
+    """Search several collections concurrently over the milvusClient pool and merge their hits into one global top-k.
+
+    With ``rerank`` set, each collection returns ``limit * rerank`` candidates that are
+    rescored against full-precision vectors before the merge. It defaults to
+    RERANK_FACTOR when a searched collection stores float16 or binary embeddings.
+    When the collections use different metrics their scores cannot be compared,
+    so every hit is rescored by exact cosine similarity before the merge.
+    ``min_count`` keeps only rows that stand for at least that many aggregated lines.
+    """
+    query_vector = embed_query(text)
+    expr = build_expr(service, level, log_family, since, until, min_count)
+    if rerank is None:
+        rerank = RERANK_FACTOR if any(_collection(name)[3] != "float32" for name in collection_names) else 0
+    candidates = limit * rerank if rerank else limit
+    executor = get_pool().executor
+    futures = [executor.submit(search_collection, name, query_vector, expr, candidates, nprobe, ef) for name in collection_names]
+    hits = [hit for future in futures for hit in future.result()]
+    mixed_metrics = len({_collection(name)[1] for name in collection_names}) > 1
+    if (rerank or mixed_metrics) and hits:
+        hits = rerank_hits(query_vector, hits)
+
+    # Order by closeness; similarity metrics rank larger scores first
+    return heapq.nsmallest(limit, hits, key=lambda hit: -hit["distance"] if hit["metric_type"] in SIMILARITY_METRICS else hit["distance"])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Semantic search over the log collections.")
+    parser.add_argument("query", help="Free-text description of the logs to find")
+    parser.add_argument("--collections", nargs="+", help="Collections to search (default: every log collection that exists)")
+    parser.add_argument("--service", action="append", help="Only logs from this service (repeatable)")
+    parser.add_argument("--level", action="append", help="Only logs with this level (repeatable)")
+    parser.add_argument("--family", help="Only logs of this family (unified collection only)")
+    parser.add_argument("--since", help="Start of the time range: 15m, 24h, 7d, epoch ms or ISO-8601 (without a range only loaded partitions are searched)")
+    parser.add_argument("--until", help="End of the time range, in the same formats")
+    parser.add_argument("--min-count", type=int, help="Only rows aggregated from at least this many log lines (bursts)")
+    parser.add_argument("--limit", type=int, default=10, help="Number of results")
+    parser.add_argument("--nprobe", type=int, default=16, help="IVF clusters to probe")
+    parser.add_argument("--ef", type=int, default=64, help="HNSW search breadth")
+    parser.add_argument("--rerank", type=int, help=f"Candidates per result re-ranked at full precision (default: {RERANK_FACTOR} for float16/binary collections, 0 disables)")
+    parser.add_argument("--embedding-store", help="Precomputed embedding store holding the full-precision vectors (see embeddingStore.py)")
+    add_milvus_arguments(parser)
+    args = parser.parse_args()
+
+    if args.embedding_store:
+        from embeddingStore import EmbeddingStore
+        _query_embedder = EmbeddingService(cache_size=10000, store=EmbeddingStore(args.embedding_store))
+
+    connect_from_args(args)
+    existing = set(utility.list_collections())
+    collection_names = args.collections or [name for name in list(streamerToMilvus.COLLECTIONS) + [UNIFIED_COLLECTION] if name in existing]
+
+    start = time.perf_counter()
+    hits = search_logs(args.query, collection_names, args.service, args.level, args.family,
+                       parse_time(args.since) if args.since else None, parse_time(args.until) if args.until else None,
+                       args.limit, args.nprobe, args.ef, rerank=args.rerank, min_count=args.min_count)
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(hits)} results from {len(collection_names)} collections in {elapsed * 1000:.0f} ms")
+    for rank, hit in enumerate(hits, 1):
+        moment = datetime.fromtimestamp(hit["timestamp"] / 1000, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        burst = ""
+        if hit.get("count", 1) > 1:
+            last = datetime.fromtimestamp(hit["last_seen"] / 1000, tz=timezone.utc).strftime("%H:%M:%S")
+            burst = f" (x{hit['count']} until {last})"
+        print(f"{rank:>3}. [{hit['distance']:.4f}] {moment} {hit['collection']} {hit['service']} {hit['log_level']}{burst}: {hit['raw_log']}")
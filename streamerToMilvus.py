@@ -1,12 +1,18 @@
-from pymilvus import connections, Collection, FieldSchema, CollectionSchema, DataType, utility
+from pymilvus import Collection, FieldSchema, CollectionSchema, DataType, utility
+import argparse
 import random
 import time
 import json
 import uuid
-from sentence_transformers import SentenceTransformer
-
-# Initialize the embedding model
-model = SentenceTransformer('all-MiniLM-L6-v2')  # Embedding model
+from batchWriter import BatchingLogWriter
+from burstAggregator import BurstAggregator, add_aggregation_arguments
+from embeddingService import BACKENDS, EmbeddingService, get_model
+from embeddingStore import EmbeddingStore
+from ingestMetrics import METRICS, MetricsSession, add_metrics_arguments
+from logSpool import LogSpool, SpoolDrainer
+from milvusClient import add_milvus_arguments, connect_from_args
+from unifiedStore import UNIFIED_COLLECTION, make_router
+from vectorCodec import VECTOR_TYPES
 
 # Define log levels and their probability distribution
 LOG_LEVELS = {
@@ -238,13 +244,67 @@ APPLICATIONS = {
     }
 }
 
-def connect_to_milvus(host: str, port: str):
-    """Connect to Milvus."""
-    connections.connect(alias="default", host=host, port=port)
-    print(f"Connected to Milvus at {host}:{port}")
+# Log families each service appears in, used to prune unified-collection partitions by service
+SERVICE_FAMILIES = {}
+for log_family, categories in APPLICATIONS.items():
+    for services in categories.values():
+        for service in services:
+            SERVICE_FAMILIES.setdefault(service, set()).add(log_family)
+
+# Collections and their types
+COLLECTIONS = {
+    "application_logs": "application_logs",
+    "kubernetes_logs": "kubernetes_logs",
+    "apache_logs": "apache_logs",
+    "httpd_logs": "httpd_logs",
+    "nginx_logs": "nginx_logs",
+    "postgresql_logs": "postgresql_logs",
+    "redis_logs": "redis_logs",
+    "kafka_logs": "kafka_logs"
+}
+
+# Embedding index used for a collection unless INDEX_CONFIG lists one for it
+DEFAULT_INDEX = {
+    "index_type": "IVF_FLAT",  # Index type
+    "metric_type": "L2",       # Distance metric
+    "params": {"nlist": 128}   # Index parameters
+}
+
+# Default index for collections storing sign-quantized BINARY_VECTOR embeddings
+DEFAULT_BINARY_INDEX = {
+    "index_type": "BIN_IVF_FLAT",
+    "metric_type": "HAMMING",
+    "params": {"nlist": 128}
+}
+
+# Longest raw_log (and template/params) kept by new collections, in bytes; longer messages are truncated on write
+RAW_LOG_MAX_LENGTH = 8192
 
-def create_collection(collection_name: str):
-    """Create a Milvus collection."""
+# Per-collection overrides, e.g. {"kafka_logs": index_config("HNSW", "COSINE")}
+INDEX_CONFIG = {}
+
+# Default build parameters for each supported index type
+INDEX_BUILD_PARAMS = {
+    "FLAT": {},
+    "IVF_FLAT": {"nlist": 128},
+    "IVF_SQ8": {"nlist": 128},
+    "IVF_PQ": {"nlist": 128, "m": 48, "nbits": 8},
+    "HNSW": {"M": 16, "efConstruction": 200},
+    "DISKANN": {},
+    "BIN_FLAT": {},
+    "BIN_IVF_FLAT": {"nlist": 128},
+}
+
+# Metrics Milvus accepts for float and for binary embeddings
+FLOAT_METRICS = ("L2", "IP", "COSINE")
+BINARY_METRICS = ("HAMMING", "JACCARD")
+
+def create_collection(collection_name: str, unified: bool = False, vector_type: str = "float32", raw_log_length: int = RAW_LOG_MAX_LENGTH):
+    """Create a Milvus collection, with a log_family field when it holds every log type.
+
+    ``vector_type`` selects how embeddings are stored (see vectorCodec.VECTOR_TYPES):
+    float16 halves the vector memory and binary keeps one sign bit per dimension.
+    """
     fields = [
         FieldSchema(name="log_id", dtype=DataType.INT64, is_primary=True),
         FieldSchema(name="timestamp", dtype=DataType.INT64),
@@ -254,24 +314,58 @@ def create_collection(collection_name: str):
         FieldSchema(name="namespace", dtype=DataType.VARCHAR, max_length=100),
         FieldSchema(name="pod_name", dtype=DataType.VARCHAR, max_length=100),
         FieldSchema(name="trace_id", dtype=DataType.VARCHAR, max_length=100),
-        FieldSchema(name="raw_log", dtype=DataType.VARCHAR, max_length=65535),
-        FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=384),  # Embedding size
+        FieldSchema(name="raw_log", dtype=DataType.VARCHAR, max_length=raw_log_length),
+        FieldSchema(name="template", dtype=DataType.VARCHAR, max_length=raw_log_length),  # raw_log with volatile tokens masked
+        FieldSchema(name="params", dtype=DataType.VARCHAR, max_length=raw_log_length),  # JSON list of the masked tokens
+        FieldSchema(name="count", dtype=DataType.INT64),  # Lines this row stands for after burst aggregation
+        FieldSchema(name="first_seen", dtype=DataType.INT64),
+        FieldSchema(name="last_seen", dtype=DataType.INT64),
+        FieldSchema(name="embedding", dtype=VECTOR_TYPES[vector_type], dim=384),  # Embedding size
     ]
+    if unified:
+        fields.insert(3, FieldSchema(name="log_family", dtype=DataType.VARCHAR, max_length=100))  # Source log type, e.g. 'kafka_logs'
     schema = CollectionSchema(fields, description=f"Logs for {collection_name}")
     collection = Collection(name=collection_name, schema=schema)
     print(f"Collection '{collection_name}' created successfully!")
     return collection
 
-def create_index(collection_name: str):
-    """Create an index on the embedding field."""
-    collection = Collection(name=collection_name)
-    index_params = {
-        "index_type": "IVF_FLAT",  # Index type
-        "metric_type": "L2",       # Distance metric
-        "params": {"nlist": 128}   # Index parameters
+def index_config(index_type: str = None, metric_type: str = None, params: dict = None, vector_type: str = "float32") -> dict:
+    """Build embedding index parameters, filling in defaults for the index type.
+
+    Raises ValueError when the index type or metric does not fit the vector type,
+    which Milvus would otherwise only reject when the index is created.
+    """
+    binary = vector_type == "binary"
+    default = DEFAULT_BINARY_INDEX if binary else DEFAULT_INDEX
+    index_type = (index_type or default["index_type"]).upper()
+    metric_type = (metric_type or default["metric_type"]).upper()
+    if index_type.startswith("BIN_") != binary:
+        raise ValueError(f"{index_type} indexes {'float' if binary else 'binary'} vectors, not {vector_type} ones")
+    if metric_type not in (BINARY_METRICS if binary else FLOAT_METRICS):
+        raise ValueError(f"{vector_type} vectors support the {', '.join(BINARY_METRICS if binary else FLOAT_METRICS)} metrics, not {metric_type}")
+    return {
+        "index_type": index_type,
+        "metric_type": metric_type,
+        "params": {**INDEX_BUILD_PARAMS.get(index_type, {}), **(params or {})},
     }
+
+def create_index(collection_name: str, index_params: dict = None):
+    """Create an index on the embedding field, using the collection's configured index by default."""
+    collection = Collection(name=collection_name)
+    binary = any(field.dtype == DataType.BINARY_VECTOR for field in collection.schema.fields)
+    index_params = index_params or INDEX_CONFIG.get(collection_name, DEFAULT_BINARY_INDEX if binary else DEFAULT_INDEX)
     collection.create_index(field_name="embedding", index_params=index_params)
-    print(f"Index created on collection '{collection_name}'.")
+    print(f"{index_params['index_type']} ({index_params['metric_type']}) index created on collection '{collection_name}'.")
+
+def create_collections(collection_names, unified: bool = False, index_params: dict = None,
+                       vector_type: str = "float32", raw_log_length: int = RAW_LOG_MAX_LENGTH):
+    """Create any missing collections along with their index."""
+    for collection_name in collection_names:
+        if collection_name not in utility.list_collections():
+            create_collection(collection_name, unified, vector_type, raw_log_length)
+            create_index(collection_name, index_params)  # Create index after collection creation
+        else:
+            print(f"Collection '{collection_name}' already exists.")
 # Function to add UUIDs to some log messages
 
 def add_uuids_to_logs(errors_dict):
@@ -309,65 +403,89 @@ def generate_log(collection_type: str):
 
 def generate_log_embedding(log_message):
     """Generate embedding for the log message."""
-    return model.encode(log_message).tolist()
-
-def insert_log_to_milvus(log_entry, collection_name):
-    """Insert a log entry into Milvus."""
-    embedding = generate_log_embedding(log_entry["message"])
-
-    # Prepare the data with all required fields
-    data = [
-        [log_entry.get("log_id", random.randint(1, 1000000))],  # Generate a random log_id if not provided
-        [log_entry["timestamp"]],
-        [log_entry["application"]],
-        [log_entry["level"]],
-        [log_entry.get("host", "default_host")],  # Add default if not provided
-        [log_entry.get("namespace", "default_namespace")],  # Add default if not provided
-        [log_entry.get("pod_name", "default_pod")],  # Add default if not provided
-        [log_entry.get("trace_id", str(random.randint(1, 1000000)))],  # Generate a random trace_id if not provided
-        [log_entry["message"]],
-        [embedding]
-    ]
-    
-    collection = Collection(collection_name)
-    collection.insert(data)
-    print(f"Inserted log into Milvus: {log_entry['message']}")
+    return get_model().encode(log_message).tolist()
 
-def stream_logs(collection_type: str, collection_name: str):
+def stream_logs(collection_type: str, collection_name: str, writer):
     """Continuously generate and stream logs."""
     for _ in range(1000):  # Loop 10 times (adjust as needed)
+        start = time.perf_counter()
         log_entry = generate_log(collection_type)  # Generate a log entry
-        insert_log_to_milvus(log_entry, collection_name)  # Insert the log into Milvus collection
+        METRICS.observe("stage_seconds", time.perf_counter() - start, stage="generate")
+        log_entry["log_family"] = collection_type
+        writer.add(collection_name, log_entry)  # Buffer the log for a batched insert into the Milvus collection
         #time.sleep(random.uniform(0.5, 2))  # Simulate streaming interval
+    METRICS.inc("rows_total", 1000, stage="generate")
     print(f"Streamed logs for {collection_type}.")
 
 if __name__ == "__main__":
-    MILVUS_HOST = "192.168.2.220"
-    MILVUS_PORT = "19530"
-    
-    # Connect to Milvus
-    connect_to_milvus(MILVUS_HOST, MILVUS_PORT)
+    parser = argparse.ArgumentParser(description="Stream generated logs into Milvus.")
+    parser.add_argument("--unified", action="store_true", help=f"Write every log type into the partitioned '{UNIFIED_COLLECTION}' collection")
+    parser.add_argument("--bucket", choices=["day", "hour"], default="day", help="Time bucket of unified-collection partitions")
+    parser.add_argument("--index-type", type=str.upper, choices=sorted(INDEX_BUILD_PARAMS), help="Index type for newly created collections")
+    parser.add_argument("--metric", type=str.upper, choices=FLOAT_METRICS + BINARY_METRICS,
+                        help="Distance metric for newly created collections (default: L2, or HAMMING for binary vectors)")
+    parser.add_argument("--index-params", type=json.loads, help='Index build parameters as JSON, e.g. \'{"nlist": 1024}\'')
+    parser.add_argument("--vector-type", choices=sorted(VECTOR_TYPES), default="float32", help="Embedding storage type for newly created collections")
+    parser.add_argument("--raw-log-length", type=int, default=RAW_LOG_MAX_LENGTH, help="Longest raw_log, in bytes, kept by newly created collections")
+    parser.add_argument("--embedding-store", help="Precomputed embedding store consulted before the model (see embeddingStore.py)")
+    parser.add_argument("--embedding-backend", choices=BACKENDS, help="CPU inference backend (default: $EMBEDDING_BACKEND or torch)")
+    parser.add_argument("--embedding-threads", type=int, help="Inference threads (default: $EMBEDDING_THREADS or the backend's default)")
+    parser.add_argument("--embedding-batch-size", type=int, default=256, help="Sentences per model call")
+    parser.add_argument("--spool", help="Write logs to this local spool first and drain it into Milvus in the background")
+    add_aggregation_arguments(parser)
+    add_milvus_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    try:
+        index_params = index_config(args.index_type, args.metric, args.index_params, args.vector_type)
+    except ValueError as error:
+        parser.error(str(error))
+    if not (args.index_type or args.metric or args.index_params):
+        index_params = None  # Keep each collection's INDEX_CONFIG entry
+    metrics = MetricsSession(args)
 
-    # Collections and their types
-    collections = {
-        "application_logs": "application_logs",
-        "kubernetes_logs": "kubernetes_logs",
-        "apache_logs": "apache_logs",
-        "httpd_logs": "httpd_logs",
-        "nginx_logs": "nginx_logs",
-        "postgresql_logs": "postgresql_logs",
-        "redis_logs": "redis_logs",
-        "kafka_logs": "kafka_logs"
-    }
+    # Connect to Milvus
+    connect_from_args(args)
 
     # Create collections if they don't exist
-    for collection_name in collections.values():
-        if collection_name not in utility.list_collections():
-            collection = create_collection(collection_name)
-            create_index(collection_name)  # Create index after collection creation
-        else:
-            print(f"Collection '{collection_name}' already exists.")
+    if args.unified:
+        create_collections([UNIFIED_COLLECTION], unified=True, index_params=index_params,
+                           vector_type=args.vector_type, raw_log_length=args.raw_log_length)
+    else:
+        create_collections(COLLECTIONS.keys(), index_params=index_params, vector_type=args.vector_type, raw_log_length=args.raw_log_length)
     
-    # Start streaming logs for each collection
-    for collection_name, collection_type in collections.items():
-        stream_logs(collection_type, collection_name)
\ No newline at end of file
+    # Start streaming logs for each collection through a shared batching writer
+    store = EmbeddingStore(args.embedding_store) if args.embedding_store else None
+    model = get_model(backend=args.embedding_backend, threads=args.embedding_threads) if (args.embedding_backend or args.embedding_threads) else None
+    embedder = EmbeddingService(model, batch_size=args.embedding_batch_size, verbose=True, store=store, report_interval=args.metrics_interval)
+    router = make_router(args.bucket) if args.unified else None
+    spool, drainer = None, None
+    if args.spool:
+        writer = BatchingLogWriter(embedder.embed, max_latency=3600.0, router=router, upsert=True, retries=1, report_interval=args.metrics_interval)
+    else:
+        writer = BatchingLogWriter(embedder.embed, router=router, report_interval=args.metrics_interval)
+    aggregator = None
+    if args.aggregate_window:
+        aggregator = BurstAggregator(writer, int(args.aggregate_window * 1000), args.aggregate_similarity, embedder.embed)
+    if args.spool:
+        spool = LogSpool(args.spool)
+        drainer = SpoolDrainer(args.spool, aggregator or writer, report_interval=args.metrics_interval)
+        drainer.start()
+    try:
+        for collection_name, collection_type in COLLECTIONS.items():
+            stream_logs(collection_type, UNIFIED_COLLECTION if args.unified else collection_name, spool or aggregator or writer)
+    finally:
+        if spool is not None:
+            spool.close()
+            drainer.stop()
+        (aggregator or writer).close()
+        metrics.close()
+    if aggregator is not None:
+        aggregated = aggregator.stats()
+        print(f"Aggregated {aggregated['received']} logs into {aggregated['emitted']} rows ({aggregated['reduction']:.1%} fewer).")
+    stats = writer.stats()
+    print(f"Wrote {stats['rows_written']} logs at {stats['rows_per_sec']:.0f} rows/sec "
+          f"({stats['flushes']} flushes, avg {stats['avg_flush_ms']:.1f} ms, max {stats['max_flush_ms']:.1f} ms).")
+    embed_stats = embedder.stats()
+    print(f"Embedding cache hit ratio {embed_stats['hit_ratio']:.1%}, {embed_stats['store_hits']} store hits; "
+          f"{embed_stats['encoded']} of {embed_stats['messages']} messages encoded in {embed_stats['encode_seconds']:.1f} s.")
@@ -0,0 +1,161 @@
+import re
+from datetime import datetime, timezone
+from pymilvus import utility
+from milvusClient import get_pool
+
+# Single collection holding every log family, as proposed in schema.txt
+UNIFIED_COLLECTION = "all_logs"
+
+# Partitions are named <log_family>_<bucket>; the bucket is a UTC day or hour.
+# Milvus does not allow manual partitions on a collection with a partition-key
+# field, so the family is encoded in the partition name next to the time bucket.
+BUCKET_FORMATS = {"day": "%Y%m%d", "hour": "%Y%m%d%H"}
+BUCKET_MILLIS = {"day": 24 * 60 * 60 * 1000, "hour": 60 * 60 * 1000}
+PARTITION_REGEX = re.compile(r"^(?P<family>\w+?)_(?P<bucket>\d{8}|\d{10})$")
+# Milvus partition names must be [A-Za-z_][A-Za-z0-9_]*, so families must be too
+FAMILY_REGEX = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# Filter clauses the pruner understands; anything else leaves all partitions in play
+EQUALS_REGEX = re.compile(r"^(log_family|service)\s*==\s*['\"]([^'\"]*)['\"]$")
+IN_REGEX = re.compile(r"^(log_family|service)\s+in\s+\[([^\]]*)\]$")
+RANGE_REGEX = re.compile(r"^timestamp\s*(>=|>|<=|<|==)\s*(\d+)$")
+
+
+def safe_family(value: str) -> str:
+    """Map a client-supplied log family onto a name that can be used in a partition name."""
+    family = re.sub(r"[^A-Za-z0-9_]", "_", value)
+    return family if FAMILY_REGEX.match(family) else f"_{family}"
+
+
+def partition_for(log_family: str, timestamp: int, bucket: str = "day") -> str:
+    """Return the partition name for a log family and a millisecond timestamp."""
+    if not FAMILY_REGEX.match(log_family):
+        raise ValueError(f"Log family '{log_family}' is not a valid partition name prefix (see safe_family)")
+    moment = datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc)
+    return f"{log_family}_{moment.strftime(BUCKET_FORMATS[bucket])}"
+
+
+def bucket_range(partition_name: str):
+    """Return (log_family, first_ms, last_ms) for a partition name, or None if it is not a bucket."""
+    match = PARTITION_REGEX.match(partition_name)
+    if not match:
+        return None
+    bucket = "day" if len(match.group("bucket")) == 8 else "hour"
+    start = datetime.strptime(match.group("bucket"), BUCKET_FORMATS[bucket]).replace(tzinfo=timezone.utc)
+    first_ms = int(start.timestamp() * 1000)
+    return match.group("family"), first_ms, first_ms + BUCKET_MILLIS[bucket] - 1
+
+
+def make_router(bucket: str = "day"):
+    """Return a BatchingLogWriter router that sends unified rows to their family/time partition."""
+    def route(collection_name: str, log_entry: dict):
+        if collection_name != UNIFIED_COLLECTION:
+            return None
+        return partition_for(log_entry["log_family"], log_entry["timestamp"], bucket)
+    return route
+
+
+def parse_filter(expr: str, service_families: dict = None):
+    """Extract the allowed families and timestamp bounds from a filter expression.
+
+    Returns (families, lower_ms, upper_ms) where families is None when the
+    expression does not restrict them, or None when the expression cannot be
+    pruned safely (e.g. it uses ``or``/``not``).
+    """
+    families, lower, upper = None, None, None
+    if not expr or not expr.strip():
+        return families, lower, upper
+    if re.search(r"\|\||\bor\b|\bnot\b|!(?!=)", expr):
+        return None
+
+    for clause in re.split(r"&&|\band\b", expr):
+        clause = clause.strip().strip("()").strip()
+        values = None
+        match = EQUALS_REGEX.match(clause)
+        if match:
+            field, values = match.group(1), {match.group(2)}
+        else:
+            match = IN_REGEX.match(clause)
+            if match:
+                field, values = match.group(1), {value.strip().strip("'\"") for value in match.group(2).split(",") if value.strip()}
+        if values is not None:
+            if field == "service":
+                if service_families is None or any(value not in service_families for value in values):
+                    continue  # Unknown service; cannot narrow the families
+                values = set().union(*(service_families[value] for value in values))
+            families = values if families is None else families & values
+            continue
+
+        match = RANGE_REGEX.match(clause)
+        if match:
+            operator, value = match.group(1), int(match.group(2))
+            if operator in (">=", ">", "=="):
+                lower = max(lower, value) if lower is not None else value
+            if operator in ("<=", "<", "=="):
+                upper = min(upper, value) if upper is not None else value
+    return families, lower, upper
+
+
+def searchable_partitions(collection) -> list:
+    """Return the collection's time-bucket partitions plus the other ones (such as _default) that hold rows."""
+    return [partition.name for partition in collection.partitions if bucket_range(partition.name) or not partition.is_empty]
+
+
+def partitions_for_expr(partition_names, expr: str, service_families: dict = None):
+    """Return the partitions a search with this filter has to touch, or None for all of them.
+
+    Partitions that are not time buckets, such as a _default holding rows
+    written without a router, cannot be pruned and are always kept.
+    """
+    parsed = parse_filter(expr, service_families)
+    if parsed is None or parsed == (None, None, None):
+        return None
+    families, lower, upper = parsed
+
+    selected = []
+    for partition_name in partition_names:
+        bucket = bucket_range(partition_name)
+        if bucket is None:
+            selected.append(partition_name)
+            continue
+        family, first_ms, last_ms = bucket
+        if families is not None and family not in families:
+            continue
+        if (lower is not None and last_ms < lower) or (upper is not None and first_ms > upper):
+            continue
+        selected.append(partition_name)
+    return selected
+
+
+def load_for_search(collection_name: str, partition_names, alias: str):
+    """Make sure a search over these partitions (None: all of them) can run on a pooled connection.
+
+    The retention manager keeps only the hot window of the unified collection
+    loaded; older partitions a time filter reaches are loaded on demand and
+    released again by its next run, and searches without one cover whatever is
+    loaded. Other collections are loaded whole.
+    """
+    if collection_name == UNIFIED_COLLECTION and not partition_names and utility.load_state(collection_name, using=alias).name != "NotLoad":
+        return
+    get_pool().ensure_loaded(collection_name, partition_names, alias)
+
+
+def search_unified(query_vectors, expr: str = None, limit: int = 10, param: dict = None, output_fields=None,
+                   service_families: dict = None):
+    """Search the unified collection, touching only the partitions the filter allows."""
+    def run(alias: str):
+        collection = get_pool().collection(UNIFIED_COLLECTION, alias=alias)
+        partition_names = partitions_for_expr(searchable_partitions(collection), expr, service_families)
+        if partition_names == []:
+            return [[] for _ in query_vectors]  # The filter rules out every partition
+        load_for_search(UNIFIED_COLLECTION, partition_names, alias)
+        return collection.search(
+            data=query_vectors,
+            anns_field="embedding",
+            param=param or {"metric_type": "L2", "params": {"nprobe": 10}},
+            limit=limit,
+            expr=expr or None,
+            partition_names=partition_names,
+            output_fields=output_fields,
+        )
+    return get_pool().call("read", run, UNIFIED_COLLECTION)
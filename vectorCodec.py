@@ -0,0 +1,39 @@
+import numpy as np
+from pymilvus import DataType
+
+# Embedding storage types selectable in streamerToMilvus.create_collection
+VECTOR_TYPES = {
+    "float32": DataType.FLOAT_VECTOR,
+    "float16": DataType.FLOAT16_VECTOR,
+    "binary": DataType.BINARY_VECTOR,  # One sign bit per dimension, searched by Hamming distance
+}
+
+
+def vector_type_of(dtype) -> str:
+    """Return the VECTOR_TYPES name of a Milvus vector field type."""
+    return next(name for name, vector_dtype in VECTOR_TYPES.items() if vector_dtype == dtype)
+
+
+def vector_bytes(dim: int, vector_type: str) -> int:
+    """Stored size of one embedding."""
+    return {"float32": dim * 4, "float16": dim * 2, "binary": dim // 8}[vector_type]
+
+
+def sign_bits(vectors) -> np.ndarray:
+    """Sign-quantize float embeddings into packed bits, one row per vector."""
+    return np.packbits(np.asarray(vectors) > 0, axis=1)
+
+
+def encode_vectors(vectors, vector_type: str):
+    """Convert float embeddings into the values a field of the given vector type accepts."""
+    if vector_type == "float32":
+        return vectors
+    if vector_type == "float16":
+        return list(np.asarray(vectors, dtype=np.float16))
+    return [row.tobytes() for row in sign_bits(vectors)]
+
+
+def truncate_utf8(value: str, max_bytes: int) -> str:
+    """Cut a string to at most max_bytes of UTF-8 without splitting a character."""
+    encoded = value.encode("utf-8")
+    return value if len(encoded) <= max_bytes else encoded[:max_bytes].decode("utf-8", errors="ignore")